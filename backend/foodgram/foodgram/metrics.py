@@ -0,0 +1,37 @@
+from django.core.cache import cache
+
+PREFIX = 'metrics:'
+
+# Счетчики, которые показывает команда show_metrics. Для пар
+# `<имя>.hit`/`<имя>.miss` дополнительно считается доля попаданий.
+COUNTERS = (
+    'auth_token.hit',
+    'auth_token.miss',
+    'tasks.done',
+    'tasks.retried',
+    'tasks.failed',
+)
+
+
+def incr(name, delta=1):
+    """Увеличивает счетчик в общем кэше"""
+    key = PREFIX + name
+    try:
+        cache.incr(key, delta)
+    except ValueError:
+        cache.add(key, 0, None)
+        cache.incr(key, delta)
+
+
+def snapshot(names=COUNTERS):
+    """Текущие значения счетчиков и доли попаданий в кэш"""
+    values = cache.get_many([PREFIX + name for name in names])
+    result = {name: values.get(PREFIX + name, 0) for name in names}
+    for name in names:
+        if name.endswith('.hit'):
+            prefix = name[:-len('.hit')]
+            total = result[name] + result.get(f'{prefix}.miss', 0)
+            result[f'{prefix}.hit_ratio'] = (
+                round(result[name] / total, 4) if total else None
+            )
+    return result
@@ -0,0 +1,220 @@
+import json
+import os
+import re
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.contrib import admin
+from django.core import signing
+from django.db import connections
+from django.http import FileResponse, Http404, HttpResponse
+from django.shortcuts import render
+
+HEADER = 'HTTP_X_PROFILE'
+SIGNING_SALT = 'foodgram.profiling'
+PROFILE_NAME = re.compile(r'^\d+-[0-9a-f]{8}$')
+
+
+def make_token():
+    """Подписанное значение заголовка X-Profile"""
+    return signing.TimestampSigner(salt=SIGNING_SALT).sign('profile')
+
+
+def is_allowed(request, value):
+    """Профилирование доступно сотрудникам и по подписанному заголовку"""
+    try:
+        signing.TimestampSigner(salt=SIGNING_SALT).unsign(
+            value, max_age=settings.PROFILING_TOKEN_MAX_AGE
+        )
+        return True
+    except signing.BadSignature:
+        user = getattr(request, 'user', None)
+        return bool(user and user.is_staff)
+
+
+class StackSampler(threading.Thread):
+    """Периодически снимает стек потока запроса.
+
+    Результат — счетчик свернутых стеков (collapsed stacks), который
+    понимают flamegraph.pl и speedscope.
+    """
+
+    def __init__(self, thread_id, interval):
+        super().__init__(daemon=True)
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self.finished = threading.Event()
+
+    def run(self):
+        while not self.finished.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f'{code.co_name} '
+                             f'({os.path.basename(code.co_filename)}:'
+                             f'{code.co_firstlineno})')
+                frame = frame.f_back
+            if stack:
+                self.stacks[';'.join(reversed(stack))] += 1
+
+    def stop(self):
+        self.finished.set()
+        self.join()
+
+    def collapsed(self):
+        return ''.join(
+            f'{stack} {count}\n' for stack, count in self.stacks.items()
+        )
+
+
+class QueryRecorder:
+    """execute_wrapper, записывающий SQL запроса и время выполнения"""
+
+    def __init__(self):
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries.append({
+                'alias': context['connection'].alias,
+                'sql': sql,
+                'many': many,
+                'ms': round((time.perf_counter() - start) * 1000, 3),
+            })
+
+
+def save_profile(profile):
+    """Сохраняет профиль и удаляет самые старые сверх лимита"""
+    directory = settings.PROFILING_DIR
+    os.makedirs(directory, exist_ok=True)
+    name = f'{time.time_ns()}-{uuid.uuid4().hex[:8]}'
+    path = os.path.join(directory, f'{name}.json')
+    with open(f'{path}.tmp', 'w', encoding='utf-8') as f:
+        json.dump(profile, f, ensure_ascii=False)
+    os.replace(f'{path}.tmp', path)
+    for old in list_profiles()[settings.PROFILING_MAX_FILES:]:
+        try:
+            os.remove(os.path.join(directory, f'{old}.json'))
+        except FileNotFoundError:
+            pass
+    return name
+
+
+def list_profiles():
+    """Имена сохраненных профилей, новые первыми"""
+    try:
+        names = os.listdir(settings.PROFILING_DIR)
+    except FileNotFoundError:
+        return []
+    return sorted(
+        (name[:-len('.json')] for name in names
+         if name.endswith('.json')
+         and PROFILE_NAME.match(name[:-len('.json')])),
+        reverse=True
+    )
+
+
+def load_profile(name):
+    if not PROFILE_NAME.match(name):
+        raise Http404
+    path = os.path.join(settings.PROFILING_DIR, f'{name}.json')
+    try:
+        with open(path, encoding='utf-8') as f:
+            return path, json.load(f)
+    except FileNotFoundError:
+        raise Http404
+
+
+class ProfilingMiddleware:
+    """Профилирование отдельных запросов по заголовку X-Profile.
+
+    Без заголовка запрос проходит без изменений. Значение заголовка —
+    подписанный токен из команды profile_token, либо любое значение
+    для сотрудника, вошедшего в админку.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        value = request.META.get(HEADER)
+        if value is None or not is_allowed(request, value):
+            return self.get_response(request)
+        recorder = QueryRecorder()
+        sampler = StackSampler(threading.get_ident(),
+                               settings.PROFILING_INTERVAL)
+        started = time.perf_counter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(recorder))
+            sampler.start()
+            try:
+                response = self.get_response(request)
+            finally:
+                sampler.stop()
+        duration = time.perf_counter() - started
+        response['X-Profile-Id'] = save_profile({
+            'method': request.method,
+            'path': request.get_full_path(),
+            'status': response.status_code,
+            'started': time.time() - duration,
+            'ms': round(duration * 1000, 3),
+            'samples': sum(sampler.stacks.values()),
+            'stacks': sampler.collapsed(),
+            'queries': recorder.queries,
+        })
+        return response
+
+
+def profile_list(request):
+    profiles = []
+    for name in list_profiles():
+        try:
+            profile = load_profile(name)[1]
+        except Http404:
+            continue
+        profile['name'] = name
+        profile['sql_count'] = len(profile['queries'])
+        profile['sql_ms'] = round(
+            sum(query['ms'] for query in profile['queries']), 3
+        )
+        profile['started'] = time.strftime(
+            '%Y-%m-%d %H:%M:%S', time.localtime(profile['started'])
+        )
+        profiles.append(profile)
+    return render(request, 'admin/profiles.html', {
+        **admin.site.each_context(request),
+        'title': 'Профили запросов',
+        'profiles': profiles,
+    })
+
+
+def profile_download(request, name, kind):
+    path, profile = load_profile(name)
+    if kind == 'json':
+        return FileResponse(open(path, 'rb'), as_attachment=True,
+                            filename=f'{name}.json')
+    if kind == 'stacks':
+        response = HttpResponse(profile['stacks'],
+                                content_type='text/plain; charset=utf-8')
+        response['Content-Disposition'] = (
+            f'attachment; filename="{name}.collapsed.txt"'
+        )
+        return response
+    if kind == 'sql':
+        return HttpResponse(
+            ''.join(f'-- {query["ms"]} ms\n{query["sql"]};\n\n'
+                    for query in profile['queries']),
+            content_type='text/plain; charset=utf-8'
+        )
+    raise Http404
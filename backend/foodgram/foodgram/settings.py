@@ -1,4 +1,5 @@
 import os
+import tempfile
 from pathlib import Path
 
 from dotenv import load_dotenv
@@ -40,9 +41,11 @@ INSTALLED_APPS = [
 
     'recipes.apps.RecipesConfig',
     'users.apps.UsersConfig',
+    'taskqueue.apps.TaskqueueConfig',
 ]
 
 MIDDLEWARE = [
+    'recipes.shortlinks.ShortLinkMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -50,6 +53,8 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'foodgram.sqlstats.SQLStatsMiddleware',
+    'foodgram.profiling.ProfilingMiddleware',
 ]
 
 ROOT_URLCONF = 'foodgram.urls'
@@ -57,7 +62,7 @@ ROOT_URLCONF = 'foodgram.urls'
 TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
-        'DIRS': [],
+        'DIRS': [BASE_DIR / 'templates'],
         'APP_DIRS': True,
         'OPTIONS': {
             'context_processors': [
@@ -89,6 +94,19 @@ DATABASES = {
 }
 
 
+# Для нескольких воркеров нужен общий кэш (например, Redis или Memcached):
+# на нем держатся ограничения частоты запросов и инвалидация.
+# В docker-compose это сервис cache (Redis).
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv(
+            'CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'
+        ),
+        'LOCATION': os.getenv('CACHE_LOCATION', ''),
+    }
+}
+
+
 # Password validation
 # https://docs.djangoproject.com/en/3.2/ref/settings/#auth-password-validators
 
@@ -146,15 +164,27 @@ REST_FRAMEWORK = {
     ],
 
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
+        'users.authentication.CachedTokenAuthentication',
     ],
     'DEFAULT_FILTER_BACKENDS': [
         'django_filters.rest_framework.DjangoFilterBackend'
     ],
     'DEFAULT_PAGINATION_CLASS': 'recipes.pagination.RecipePagination',
     'PAGE_SIZE': 6,
+    'DEFAULT_THROTTLE_RATES': {
+        'shopping_cart_user': '10/min',
+        'shopping_cart_ip': '30/min',
+        'recipe_link_user': '30/min',
+        'recipe_link_ip': '60/min',
+        'recipe_write_user': '10/min',
+        'recipe_write_ip': '30/min',
+        'avatar_user': '5/min',
+        'avatar_ip': '15/min',
+    },
 }
 
+TOKEN_CACHE_TTL = 60
+
 DJOSER = {
     "LOGIN_FIELD": 'email',
     'USER_ID_FIELD': 'id',
@@ -180,3 +210,81 @@ SHOPPING_CART = 'shopping_list.txt'
 CSRF_TRUSTED_ORIGINS = ["https://foodyam.zapto.org"]
 DOMEN = 'foodyam.zapto.org'
 MAX_LTH = 200
+
+# Лента подписок: рецепты авторов с большим числом подписчиков
+# не рассылаются по лентам, а добираются при чтении.
+FEED_FANOUT_MAX_FOLLOWERS = int(os.getenv('FEED_FANOUT_MAX_FOLLOWERS', 1000))
+FEED_BACKFILL_SIZE = 50
+FEED_BATCH_SIZE = 1000
+
+SIMILAR_RECIPES_TOP_K = 10
+
+TAG_SLUGS_CACHE_TTL = 300
+
+POPULAR_RECIPES_SIZE = 100
+POPULAR_RECIPES_CACHE_TTL = 600
+
+# Счетчики фасетов списка рецептов (?facets=tags,author).
+FACETS_CACHE_TTL = 30
+FACETS_AUTHOR_LIMIT = 20
+
+# Синхронизация: номера журнала упорядочены по коммиту (lock_changelog).
+SYNC_BATCH_SIZE = 100
+SYNC_MAX_BATCH_SIZE = 1000
+
+VIEWER_STATE_CACHE_TTL = 60 * 60 * 24
+RESPONSE_CACHE_TTL = 60 * 10
+
+# Служебные файлы диагностики пишутся вне дерева исходников.
+DIAGNOSTICS_DIR = Path(tempfile.gettempdir()) / 'foodgram'
+
+# Профилирование запросов по заголовку X-Profile: профили хранятся
+# в кольцевом буфере из PROFILING_MAX_FILES файлов.
+PROFILING_DIR = os.getenv('PROFILING_DIR', DIAGNOSTICS_DIR / 'profiles')
+PROFILING_MAX_FILES = 50
+PROFILING_INTERVAL = 0.005
+PROFILING_TOKEN_MAX_AGE = 60 * 60
+
+# Статистика SQL по отпечаткам запросов, см. команду top_queries.
+# Включается на время разбора: execute_wrapper стоит каждому запросу.
+SQLSTATS_ENABLED = os.getenv('SQLSTATS_ENABLED', 'False') == 'True'
+SQLSTATS_DIR = os.getenv('SQLSTATS_DIR', DIAGNOSTICS_DIR / 'sqlstats')
+SQLSTATS_SLOW_MS = int(os.getenv('SQLSTATS_SLOW_MS', 200))
+SQLSTATS_SAMPLE_SIZE = 256
+SQLSTATS_FLUSH_INTERVAL = 30
+# Файлы процессов, не обновлявшиеся дольше, top_queries удаляет.
+SQLSTATS_STALE_AFTER = 60 * 60
+
+# Ответы на POST с заголовком Idempotency-Key хранятся в кэше CACHES.
+# Для нескольких воркеров нужен общий кэш (CACHE_BACKEND).
+IDEMPOTENCY_KEY_TTL = 60 * 60 * 24
+IDEMPOTENCY_LOCK_TIMEOUT = 60
+
+# Короткие ссылки: кэш процесса и карта для nginx
+# (команда export_nginx_links).
+SHORT_LINK_CACHE_SIZE = 10000
+SHORT_LINK_CACHE_TTL = 60 * 10
+SHORT_LINKS_MAP_PATH = os.getenv(
+    'SHORT_LINKS_MAP_PATH', BASE_DIR / 'links' / 'short_links.map'
+)
+
+# Очередь фоновых задач в БД, воркеры — команда run_workers.
+# TASKQUEUE_EAGER выполняет задачи сразу после коммита, без воркеров;
+# по умолчанию включен при DEBUG, чтобы runserver обходился без них.
+# Счетчики tasks.* пишутся в кэш: с воркерами в отдельных процессах
+# show_metrics видит их только при общем кэше (CACHE_BACKEND).
+TASKQUEUE_EAGER = os.getenv('TASKQUEUE_EAGER', str(DEBUG)) == 'True'
+TASKQUEUE_MAX_ATTEMPTS = 5
+TASKQUEUE_RETRY_BACKOFF = 10
+TASKQUEUE_RETRY_BACKOFF_MAX = 60 * 60
+TASKQUEUE_POLL_INTERVAL = 1
+# Воркер продлевает аренду задач каждые TASKQUEUE_HEARTBEAT_INTERVAL
+# секунд; задача с арендой старше TASKQUEUE_LEASE возвращается в очередь.
+TASKQUEUE_HEARTBEAT_INTERVAL = 30
+TASKQUEUE_LEASE = 60 * 2
+TASKQUEUE_MAINTENANCE_INTERVAL = 30
+TASKQUEUE_KEEP_DONE = 60 * 60 * 24 * 7
+TASKQUEUE_PERIODIC = {
+    'recipes.tasks.purge': 60 * 10,
+    'recipes.tasks.rollup_popular': 60 * 5,
+}
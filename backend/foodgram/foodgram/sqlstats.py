@@ -0,0 +1,181 @@
+import atexit
+import json
+import logging
+import os
+import random
+import re
+import socket
+import threading
+import time
+import traceback
+import uuid
+from contextlib import ExitStack
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+logger = logging.getLogger('foodgram.sql')
+
+# Метка поколения статистики в SQLSTATS_DIR, ее меняет top_queries --reset.
+GENERATION_FILE = 'generation'
+
+NORMALIZE = (
+    (re.compile(r"'(?:[^']|'')*'"), '?'),
+    (re.compile(r'\b\d+(?:\.\d+)?\b'), '?'),
+    (re.compile(r'%s'), '?'),
+    (re.compile(r'\(\s*\?(?:\s*,\s*\?)*\s*\)'), '(...)'),
+    (re.compile(r'\s+'), ' '),
+)
+
+
+@lru_cache(maxsize=4096)
+def fingerprint(sql):
+    """SQL без литералов и параметров: одинаковый для запросов,
+    отличающихся только значениями"""
+    for pattern, replacement in NORMALIZE:
+        sql = pattern.sub(replacement, sql)
+    return sql.strip()
+
+
+def project_stack():
+    """Кадры стека из кода проекта, без Django и сторонних пакетов"""
+    root = str(settings.BASE_DIR)
+    return ''.join(traceback.format_list([
+        frame for frame in traceback.extract_stack()[:-2]
+        if frame.filename.startswith(root)
+        and 'site-packages' not in frame.filename
+    ]))
+
+
+def generation_path():
+    return os.path.join(settings.SQLSTATS_DIR, GENERATION_FILE)
+
+
+def read_generation():
+    try:
+        with open(generation_path(), encoding='utf-8') as f:
+            return f.read().strip()
+    except FileNotFoundError:
+        return ''
+
+
+def new_generation():
+    """Начинает новое поколение: процессы отбросят накопленное
+    при следующем сбросе в файл"""
+    os.makedirs(settings.SQLSTATS_DIR, exist_ok=True)
+    path = generation_path()
+    with open(f'{path}.tmp', 'w', encoding='utf-8') as f:
+        f.write(uuid.uuid4().hex)
+    os.replace(f'{path}.tmp', path)
+
+
+class QueryStats:
+    """Накопленная статистика запросов процесса.
+
+    Ключ — пара (отпечаток, представление). Для p95 хранится
+    ограниченная случайная выборка длительностей (reservoir sampling).
+    Статистика периодически сбрасывается в файл процесса
+    в SQLSTATS_DIR, команда top_queries объединяет файлы. Если метка
+    поколения сменилась, накопленное до сброса отбрасывается.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.stats = {}
+        self.flushed = time.monotonic()
+        self.generation = read_generation()
+
+    def add(self, sql, view, ms):
+        key = (fingerprint(sql), view)
+        with self.lock:
+            item = self.stats.get(key)
+            if item is None:
+                item = self.stats[key] = {
+                    'count': 0, 'total_ms': 0.0, 'max_ms': 0.0,
+                    'samples': [],
+                }
+            item['count'] += 1
+            item['total_ms'] += ms
+            item['max_ms'] = max(item['max_ms'], ms)
+            samples = item['samples']
+            if len(samples) < settings.SQLSTATS_SAMPLE_SIZE:
+                samples.append(ms)
+            else:
+                index = random.randrange(item['count'])
+                if index < len(samples):
+                    samples[index] = ms
+
+    def maybe_flush(self):
+        if time.monotonic() - self.flushed >= settings.SQLSTATS_FLUSH_INTERVAL:
+            self.flush()
+
+    def flush(self):
+        generation = read_generation()
+        with self.lock:
+            self.flushed = time.monotonic()
+            reset = generation != self.generation
+            if reset:
+                self.stats.clear()
+                self.generation = generation
+            rows = [
+                {'fingerprint': sql, 'view': view, **item}
+                for (sql, view), item in self.stats.items()
+            ]
+        # После сброса пустой список перезаписывает файл процесса,
+        # если тот успел записать его заново.
+        if not rows and not reset:
+            return
+        # pid берется при записи: с gunicorn --preload middleware
+        # создается в мастер-процессе до запуска воркеров.
+        path = os.path.join(settings.SQLSTATS_DIR,
+                            f'{socket.gethostname()}-{os.getpid()}.json')
+        os.makedirs(settings.SQLSTATS_DIR, exist_ok=True)
+        with open(f'{path}.tmp', 'w', encoding='utf-8') as f:
+            json.dump(rows, f, ensure_ascii=False)
+        os.replace(f'{path}.tmp', path)
+
+
+class QueryObserver:
+    """execute_wrapper одного запроса к приложению"""
+
+    def __init__(self, stats):
+        self.stats = stats
+        self.view = None
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            ms = (time.perf_counter() - start) * 1000
+            self.stats.add(sql, self.view, ms)
+            if ms >= settings.SQLSTATS_SLOW_MS:
+                logger.warning('Медленный запрос %.1f мс в %s: %s\n%s',
+                               ms, self.view, sql, project_stack())
+
+
+class SQLStatsMiddleware:
+    """Собирает статистику SQL по отпечаткам и представлениям"""
+
+    def __init__(self, get_response):
+        if not settings.SQLSTATS_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.stats = QueryStats()
+        atexit.register(self.stats.flush)
+
+    def __call__(self, request):
+        observer = QueryObserver(self.stats)
+        request._sql_observer = observer
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(observer))
+                return self.get_response(request)
+        finally:
+            self.stats.maybe_flush()
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request._sql_observer.view = request.resolver_match.view_name
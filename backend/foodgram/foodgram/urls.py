@@ -2,7 +2,13 @@ from django.contrib import admin
 from django.urls import include, path
 from recipes.views import redirect_to_full_link
 
+from .profiling import profile_download, profile_list
+
 urlpatterns = [
+    path('admin/profiles/', admin.site.admin_view(profile_list),
+         name='profile-list'),
+    path('admin/profiles/<str:name>/<str:kind>/',
+         admin.site.admin_view(profile_download), name='profile-download'),
     path('admin/', admin.site.urls),
     path('api/', include('users.urls')),
     path('api/', include('recipes.urls')),
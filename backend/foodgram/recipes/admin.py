@@ -1,6 +1,18 @@
 from django.contrib import admin
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from recipes.deletion import mark_recipe_deleted
+from recipes.etags import bump_recipe_versions
 from recipes.models import (Favorite, Ingredient, Link, Recipe,
                             RecipeIngredients, ShoppingCart, Tag)
+from recipes.paginators import EstimatedCountPaginator
+from recipes.snapshots import refresh_snapshots
+
+
+class LargeTableAdmin(admin.ModelAdmin):
+    """Список без полного подсчета строк для больших таблиц"""
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
 
 
 @admin.register(Tag)
@@ -13,45 +25,103 @@ class TagAdmin(admin.ModelAdmin):
 @admin.register(Ingredient)
 class IngredientAdmin(admin.ModelAdmin):
     list_display = ('pk', 'name', 'measurement_unit')
-    search_fields = ('name',)
-    list_filter = ('name',)
+    search_fields = ('name__startswith',)
+    ordering = ('name',)
 
 
 @admin.register(RecipeIngredients)
-class RecipeIngredientsAdmin(admin.ModelAdmin):
+class RecipeIngredientsAdmin(LargeTableAdmin):
     list_display = ('pk', 'recipe', 'ingredient', 'amount')
+    list_select_related = ('recipe', 'ingredient')
+    raw_id_fields = ('recipe', 'ingredient')
+
+    def recipes_changed(self, recipe_ids):
+        refresh_snapshots(recipe_ids)
+        bump_recipe_versions(recipe_ids)
+
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        recipe_ids = {obj.recipe_id}
+        if change and 'recipe' in form.changed_data:
+            recipe_ids.add(form.initial['recipe'])
+        self.recipes_changed(list(recipe_ids))
+
+    def delete_model(self, request, obj):
+        super().delete_model(request, obj)
+        self.recipes_changed([obj.recipe_id])
+
+    def delete_queryset(self, request, queryset):
+        recipe_ids = list(queryset.values_list('recipe', flat=True).distinct())
+        super().delete_queryset(request, queryset)
+        self.recipes_changed(recipe_ids)
 
 
 @admin.register(Favorite)
-class FavoriteAdmin(admin.ModelAdmin):
+class FavoriteAdmin(LargeTableAdmin):
     list_display = ('pk', 'user', 'recipe')
-    search_fields = ('user', 'recipe')
+    list_select_related = ('user', 'recipe')
+    raw_id_fields = ('user', 'recipe')
+    search_fields = ('user__username__startswith',)
 
 
 @admin.register(ShoppingCart)
-class ShoppingCartAdmin(admin.ModelAdmin):
+class ShoppingCartAdmin(LargeTableAdmin):
     list_display = ('pk', 'user', 'recipe')
-    search_fields = ('user', 'recipe')
+    list_select_related = ('user', 'recipe')
+    raw_id_fields = ('user', 'recipe')
+    search_fields = ('user__username__startswith',)
 
 
 class RecipeIngredientsInline(admin.TabularInline):
     model = RecipeIngredients
+    autocomplete_fields = ('ingredient',)
+    extra = 1
 
 
 @admin.register(Recipe)
-class RecipeAdmin(admin.ModelAdmin):
+class RecipeAdmin(LargeTableAdmin):
     list_display = ('pk', 'name', 'author', 'is_favorited')
-    search_fields = ('name', 'author__username')
-    list_filter = ('name', 'author', 'tags')
+    list_select_related = ('author',)
+    search_fields = ('name__startswith', 'author__username__startswith')
+    list_filter = ('tags',)
+    autocomplete_fields = ('author',)
     inlines = [
         RecipeIngredientsInline,
     ]
 
-    @admin.display(description='количество добавлений в избранное')
+    def get_queryset(self, request):
+        # Коррелированный подзапрос считается только для строк страницы,
+        # а не группировкой по всей таблице.
+        favorites = Favorite.objects.filter(
+            recipe=OuterRef('pk')
+        ).order_by().values('recipe').annotate(count=Count('pk'))
+        return super().get_queryset(request).annotate(
+            favorites_count=Coalesce(Subquery(favorites.values('count')), 0)
+        )
+
+    @admin.display(description='количество добавлений в избранное',
+                   ordering='favorites_count')
     def is_favorited(self, recipe):
-        return recipe.favorite.count()
+        return recipe.favorites_count
+
+    def save_related(self, request, form, formsets, change):
+        super().save_related(request, form, formsets, change)
+        # Ингредиенты меняются через inline, копию пересобираем после них.
+        refresh_snapshots([form.instance.pk])
+        if change:
+            bump_recipe_versions([form.instance.pk])
+
+    def delete_model(self, request, obj):
+        mark_recipe_deleted(obj)
+
+    def delete_queryset(self, request, queryset):
+        for recipe in queryset:
+            mark_recipe_deleted(recipe)
 
 
 @admin.register(Link)
-class LinkAdmin(admin.ModelAdmin):
+class LinkAdmin(LargeTableAdmin):
     list_display = ('recipe', 'original_url', 'short_link')
+    list_select_related = ('recipe',)
+    raw_id_fields = ('recipe',)
+    search_fields = ('short_link__exact',)
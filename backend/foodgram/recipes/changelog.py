@@ -0,0 +1,68 @@
+from django.db import connections, router, transaction
+from django.db.models import Q
+
+from .models import ChangeLog
+
+CREATE = 'create'
+UPDATE = 'update'
+DELETE = 'delete'
+
+# Ключ pg_advisory_xact_lock для записи в журнал.
+CHANGELOG_LOCK = 3901
+
+
+def lock_changelog(using):
+    """Блокировка записи в журнал до конца транзакции.
+
+    Номер записи выдается при вставке, а становится видимым при коммите.
+    Пока одна транзакция держит блокировку, другая не получит номер,
+    поэтому номера видны клиентам строго по возрастанию и курсор since
+    не перепрыгнет запись, закоммиченную позже. SQLite и так допускает
+    одну пишущую транзакцию.
+    """
+    connection = connections[using]
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT pg_advisory_xact_lock(%s)',
+                           [CHANGELOG_LOCK])
+
+
+def log_change(table, object_id, action, user_id=None):
+    """Записывает изменение в той же транзакции, что и само изменение"""
+    using = router.db_for_write(ChangeLog)
+    with transaction.atomic(using=using):
+        lock_changelog(using)
+        ChangeLog.objects.create(table=table, object_id=object_id,
+                                 action=action, user_id=user_id)
+
+
+def log_changes(table, object_ids, action, batch_size=1000):
+    """Пакетная запись изменений для bulk-операций без сигналов"""
+    using = router.db_for_write(ChangeLog)
+    with transaction.atomic(using=using):
+        lock_changelog(using)
+        ChangeLog.objects.bulk_create(
+            (ChangeLog(table=table, object_id=object_id, action=action)
+             for object_id in object_ids),
+            batch_size=batch_size
+        )
+
+
+def get_changes(user, since, limit):
+    """Изменения с номером больше since, видимые пользователю.
+
+    Возвращает записи пачки (для каждого объекта только последнюю),
+    номер, с которого продолжать, и признак наличия других изменений.
+    """
+    visible = Q(user__isnull=True)
+    if user.is_authenticated:
+        visible |= Q(user=user)
+    entries = list(ChangeLog.objects.filter(
+        visible, pk__gt=since
+    ).order_by('pk')[:limit + 1])
+    has_more = len(entries) > limit
+    entries = entries[:limit]
+    next_since = entries[-1].pk if entries else since
+    latest = {(entry.table, entry.object_id): entry for entry in entries}
+    entries = sorted(latest.values(), key=lambda entry: entry.pk)
+    return entries, next_since, has_more
@@ -0,0 +1,129 @@
+import itertools
+
+from django.core.files.storage import default_storage
+from django.db import models, transaction
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+from taskqueue.registry import enqueue
+from users.models import User
+
+from .changelog import DELETE, log_change, log_changes
+from .models import Recipe
+
+# Задача из recipes.tasks; модуль задач сам импортирует deletion.
+PURGE_TASK = 'recipes.tasks.purge'
+
+
+def cascade_relations(model):
+    """Модели и поля, удаляемые каскадом вместе с объектами model"""
+    return [
+        (relation.related_model, relation.field.name)
+        for relation in model._meta.get_fields(include_hidden=True)
+        if (relation.one_to_many or relation.one_to_one)
+        and relation.auto_created and not relation.concrete
+        and relation.on_delete is models.CASCADE
+    ]
+
+
+def delete_in_chunks(queryset, chunk_size):
+    """Удаляет строки queryset короткими транзакциями по chunk_size штук"""
+    manager = queryset.model._base_manager
+    while True:
+        pks = list(queryset.values_list('pk', flat=True)[:chunk_size])
+        if not pks:
+            return
+        with transaction.atomic():
+            manager.filter(pk__in=pks).delete()
+
+
+def referenced(names):
+    """Имена из names, на которые ссылаются рецепты или пользователи"""
+    return set(itertools.chain(
+        Recipe.all_objects.filter(
+            image__in=names
+        ).values_list('image', flat=True),
+        User.all_objects.filter(
+            avatar__in=names
+        ).values_list('avatar', flat=True),
+    ))
+
+
+def delete_files(names):
+    """Удаляет файлы, на которые больше не ссылается ни одна строка"""
+    names = {name for name in names if name}
+    for name in names - referenced(list(names)):
+        default_storage.delete(name)
+
+
+def mark_recipe_deleted(recipe):
+    """Скрывает рецепт, удаление выполняет фоновая задача purge"""
+    Recipe.all_objects.filter(pk=recipe.pk).update(deleted_at=timezone.now())
+    log_change('recipe', recipe.pk, DELETE)
+    enqueue(PURGE_TASK, key=PURGE_TASK)
+
+
+@transaction.atomic
+def mark_user_deleted(user):
+    """Скрывает пользователя вместе с рецептами и отзывает его токен"""
+    now = timezone.now()
+    User.all_objects.filter(pk=user.pk).update(deleted_at=now,
+                                               is_active=False)
+    recipes = Recipe.all_objects.filter(author=user, deleted_at__isnull=True)
+    log_changes('recipe', recipes.values_list('pk', flat=True), DELETE)
+    recipes.update(deleted_at=now)
+    Token.objects.filter(user=user).delete()
+    enqueue(PURGE_TASK, key=PURGE_TASK)
+
+
+def purge_recipes(recipe_ids, chunk_size):
+    """Удаляет помеченные рецепты, связанные строки и картинки"""
+    images = list(Recipe.all_objects.filter(
+        pk__in=recipe_ids
+    ).values_list('image', flat=True))
+    for model, field in cascade_relations(Recipe):
+        delete_in_chunks(
+            model._base_manager.filter(**{f'{field}__in': recipe_ids}),
+            chunk_size
+        )
+    Recipe.all_objects.filter(pk__in=recipe_ids).delete()
+    delete_files(images)
+
+
+def purge_user(user, chunk_size):
+    """Удаляет помеченного пользователя после удаления его рецептов"""
+    for model, field in cascade_relations(User):
+        if model is not Recipe:
+            delete_in_chunks(
+                model._base_manager.filter(**{field: user}), chunk_size
+            )
+    User.all_objects.filter(pk=user.pk).delete()
+    delete_files([user.avatar.name])
+
+
+def purge_deleted(chunk_size, limit=None):
+    """Выполняет отложенные удаления, возвращает число удаленных объектов.
+
+    Сначала удаляются рецепты (в том числе рецепты удаленных
+    пользователей), затем пользователи, у которых рецептов не осталось.
+    """
+    purged = 0
+    recipes = Recipe.all_objects.filter(
+        deleted_at__isnull=False
+    ).order_by('deleted_at')
+    while limit is None or purged < limit:
+        recipe_ids = list(recipes.values_list('pk', flat=True)[:chunk_size])
+        if not recipe_ids:
+            break
+        purge_recipes(recipe_ids, chunk_size)
+        purged += len(recipe_ids)
+    users = User.all_objects.filter(
+        deleted_at__isnull=False
+    ).exclude(
+        pk__in=Recipe.all_objects.values('author')
+    ).order_by('deleted_at')
+    for user in users.iterator():
+        if limit is not None and purged >= limit:
+            break
+        purge_user(user, chunk_size)
+        purged += 1
+    return purged
@@ -0,0 +1,60 @@
+import hashlib
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import F
+
+from .models import Recipe
+
+
+def bump_recipe_versions(recipes):
+    """Увеличивает версию рецептов из queryset или списка id"""
+    if not hasattr(recipes, 'update'):
+        recipes = Recipe.all_objects.filter(pk__in=recipes)
+    recipes.update(version=F('version') + 1)
+
+
+def viewer_state_key(user_id):
+    return f'viewer_state:{user_id}'
+
+
+def get_viewer_state(user):
+    """Версия избранного, покупок и подписок пользователя.
+
+    Хранится в общем кэше; при потере ключа создается новая версия,
+    что приводит лишь к лишнему полному ответу.
+    """
+    if not user.is_authenticated:
+        return 'anonymous'
+    key = viewer_state_key(user.pk)
+    cache.add(key, uuid.uuid4().hex, settings.VIEWER_STATE_CACHE_TTL)
+    return cache.get(key) or 'unknown'
+
+
+def bump_viewer_state(user_id):
+    cache.delete(viewer_state_key(user_id))
+
+
+def make_etag(*parts):
+    value = '|'.join(map(str, parts))
+    return '"{}"'.format(hashlib.md5(value.encode()).hexdigest())
+
+
+def recipe_etag(request, pk):
+    """ETag рецепта или None, если рецепта нет"""
+    if not str(pk).isdigit():
+        return None
+    version = Recipe.objects.filter(pk=pk).values_list(
+        'version', flat=True
+    ).first()
+    if version is None:
+        return None
+    return make_etag('recipe', pk, version, get_viewer_state(request.user))
+
+
+def recipe_list_etag(request, count, rows):
+    """ETag страницы списка по версиям ее рецептов и общему числу"""
+    versions = ','.join(f'{pk}:{version}' for pk, version in rows)
+    return make_etag('recipes', request.get_full_path(), count, versions,
+                     get_viewer_state(request.user))
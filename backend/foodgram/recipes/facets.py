@@ -0,0 +1,91 @@
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count
+from rest_framework.exceptions import ValidationError
+
+from .filters import RecipeFilter
+from .models import Recipe
+from .utils import get_tag_slug_map
+
+FACETS = ('tags', 'author')
+# Параметры, не влияющие на набор рецептов.
+IGNORED_PARAMS = ('page', 'limit', 'facets')
+# Фильтры, результат которых зависит от пользователя.
+VIEWER_PARAMS = ('is_favorited', 'is_in_shopping_cart')
+
+
+def parse_facets(request):
+    """Список фасетов из параметра facets=tags,author"""
+    value = request.query_params.get('facets')
+    if not value:
+        return []
+    facets = [facet for facet in value.split(',') if facet]
+    unknown = set(facets) - set(FACETS)
+    if unknown:
+        raise ValidationError(
+            {'facets': f'Допустимые значения: {", ".join(FACETS)}'}
+        )
+    return facets
+
+
+def filter_signature(request, facets):
+    params = sorted(
+        (key, sorted(request.query_params.getlist(key)))
+        for key in request.query_params
+        if key not in IGNORED_PARAMS
+    )
+    viewer = None
+    if any(key in request.query_params for key in VIEWER_PARAMS):
+        viewer = request.user.pk
+    value = repr((params, viewer, sorted(facets)))
+    return 'facets:' + hashlib.md5(value.encode()).hexdigest()
+
+
+def filtered_without(request, facet):
+    """Рецепты по текущим фильтрам, кроме фильтра самого фасета"""
+    data = request.query_params.copy()
+    data.pop(facet, None)
+    return RecipeFilter(data=data, queryset=Recipe.objects.all(),
+                        request=request).qs
+
+
+def tag_counts(request):
+    rows = dict(Recipe.tags.through.objects.filter(
+        recipe__in=filtered_without(request, 'tags').values('pk')
+    ).values('tag__slug').annotate(
+        count=Count('recipe')
+    ).order_by().values_list('tag__slug', 'count'))
+    return [{'slug': slug, 'count': rows.get(slug, 0)}
+            for slug in get_tag_slug_map()]
+
+
+def author_counts(request):
+    return [
+        {'id': author_id, 'count': count}
+        for author_id, count in filtered_without(
+            request, 'author'
+        ).order_by().values('author').annotate(
+            count=Count('pk')
+        ).order_by('-count', 'author').values_list(
+            'author', 'count'
+        )[:settings.FACETS_AUTHOR_LIMIT]
+    ]
+
+
+def facet_counts(request, facets):
+    """Число рецептов для каждого значения фасетов.
+
+    Для фасета учитываются все фильтры запроса, кроме его собственного,
+    чтобы показать, сколько рецептов даст выбор другого значения.
+    Каждый фасет считается одним запросом с GROUP BY; результат
+    кэшируется по набору фильтров на FACETS_CACHE_TTL секунд.
+    """
+    key = filter_signature(request, facets)
+    counts = cache.get(key)
+    if counts is None:
+        builders = {'tags': tag_counts, 'author': author_counts}
+        counts = {facet: builders[facet](request) for facet in facets}
+        cache.set(key, counts, settings.FACETS_CACHE_TTL)
+    return counts
@@ -0,0 +1,97 @@
+import base64
+from datetime import datetime
+
+from django.conf import settings
+from django.db.models import Q
+from rest_framework.exceptions import ValidationError
+from users.models import Subscription
+
+from .models import FeedItem, Recipe
+
+
+def fan_out_recipe(recipe):
+    """Рассылает новый рецепт по лентам подписчиков автора.
+
+    Для авторов с большим числом подписчиков рассылка не выполняется:
+    их рецепты добираются при чтении ленты (fan-in).
+    """
+    followers = Subscription.objects.filter(author=recipe.author_id)
+    if followers.count() > settings.FEED_FANOUT_MAX_FOLLOWERS:
+        return
+    batch = []
+    for user_id in followers.values_list('user_id', flat=True).iterator():
+        batch.append(FeedItem(user_id=user_id,
+                              author_id=recipe.author_id,
+                              recipe_id=recipe.pk,
+                              pub_date=recipe.pub_date))
+        if len(batch) >= settings.FEED_BATCH_SIZE:
+            FeedItem.objects.bulk_create(batch, ignore_conflicts=True)
+            batch = []
+    FeedItem.objects.bulk_create(batch, ignore_conflicts=True)
+    Recipe.objects.filter(pk=recipe.pk).update(in_timelines=True)
+
+
+def backfill_subscription(user_id, author_id):
+    """Добавляет в ленту нового подписчика последние рецепты автора"""
+    recipes = Recipe.objects.filter(
+        author=author_id, in_timelines=True
+    ).values_list('pk', 'pub_date')[:settings.FEED_BACKFILL_SIZE]
+    FeedItem.objects.bulk_create(
+        (FeedItem(user_id=user_id, author_id=author_id,
+                  recipe_id=recipe_id, pub_date=pub_date)
+         for recipe_id, pub_date in recipes),
+        ignore_conflicts=True
+    )
+
+
+def remove_subscription(user_id, author_id):
+    """Убирает рецепты автора из ленты отписавшегося пользователя"""
+    FeedItem.objects.filter(user=user_id, author=author_id).delete()
+
+
+def encode_cursor(pub_date, recipe_id):
+    value = f'{pub_date.isoformat()}|{recipe_id}'
+    return base64.urlsafe_b64encode(value.encode()).decode()
+
+
+def decode_cursor(cursor):
+    try:
+        pub_date, recipe_id = base64.urlsafe_b64decode(
+            cursor.encode()
+        ).decode().split('|')
+        return datetime.fromisoformat(pub_date), int(recipe_id)
+    except ValueError:
+        raise ValidationError({'cursor': 'Некорректный курсор.'})
+
+
+def get_feed_page(user, cursor, limit):
+    """Возвращает id рецептов страницы ленты и курсор следующей страницы.
+
+    Страница собирается слиянием двух отсортированных источников:
+    записей ленты пользователя и рецептов авторов, которые не
+    рассылались по лентам.
+    """
+    timeline = FeedItem.objects.filter(user=user)
+    fan_in = Recipe.objects.filter(author__following__user=user,
+                                   in_timelines=False)
+    if cursor:
+        pub_date, recipe_id = decode_cursor(cursor)
+        timeline = timeline.filter(
+            Q(pub_date__lt=pub_date)
+            | Q(pub_date=pub_date, recipe_id__lt=recipe_id)
+        )
+        fan_in = fan_in.filter(
+            Q(pub_date__lt=pub_date) | Q(pub_date=pub_date, pk__lt=recipe_id)
+        )
+    entries = set(timeline.order_by(
+        '-pub_date', '-recipe_id'
+    ).values_list('pub_date', 'recipe_id')[:limit + 1])
+    entries.update(fan_in.order_by(
+        '-pub_date', '-pk'
+    ).values_list('pub_date', 'pk')[:limit + 1])
+    entries = sorted(entries, reverse=True)
+    next_cursor = None
+    if len(entries) > limit:
+        entries = entries[:limit]
+        next_cursor = encode_cursor(*entries[-1])
+    return [recipe_id for _, recipe_id in entries], next_cursor
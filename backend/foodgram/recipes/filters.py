@@ -1,7 +1,19 @@
+from django import forms
+from django.db.models import Count, Exists, OuterRef
 from django_filters.rest_framework import FilterSet, filters
 from users.models import User
 
-from .models import Ingredient, Recipe, Tag
+from .models import Ingredient, Recipe, RecipeIngredients
+from .utils import get_tag_slug_map
+
+
+class IdInFilter(filters.BaseInFilter):
+    """Список id через запятую"""
+    field_class = forms.IntegerField
+
+
+def tag_choices():
+    return [(slug, slug) for slug in get_tag_slug_map()]
 
 
 class IngredientFilter(FilterSet):
@@ -16,10 +28,9 @@ class RecipeFilter(FilterSet):
     author = filters.ModelChoiceFilter(
         queryset=User.objects.all()
     )
-    tags = filters.ModelMultipleChoiceFilter(
-        queryset=Tag.objects.all(),
-        field_name='tags__slug',
-        to_field_name='slug',
+    tags = filters.MultipleChoiceFilter(
+        choices=tag_choices,
+        method='tags_filter'
     )
 
     is_favorited = filters.BooleanFilter(
@@ -30,10 +41,23 @@ class RecipeFilter(FilterSet):
         method='is_in_shopping_cart_filter',
         field_name='shopping__author'
     )
+    ingredients = IdInFilter(method='ingredients_filter')
+    exclude_ingredients = IdInFilter(method='exclude_ingredients_filter')
 
     class Meta:
         model = Recipe
-        fields = ('author', 'tags', 'is_favorited', 'is_in_shopping_cart')
+        fields = ('author', 'tags', 'is_favorited', 'is_in_shopping_cart',
+                  'ingredients', 'exclude_ingredients')
+
+    def tags_filter(self, queryset, name, value):
+        """Рецепты хотя бы с одним из тегов: EXISTS вместо join,
+        поэтому рецепт с несколькими тегами не дублируется."""
+        # Тег могли удалить после проверки choices: такой slug пропускаем.
+        slugs = get_tag_slug_map()
+        return queryset.filter(Exists(Recipe.tags.through.objects.filter(
+            recipe=OuterRef('pk'),
+            tag__in=[slugs[slug] for slug in value if slug in slugs]
+        )))
 
     def is_favorited_filter(self, queryset, name, value):
         if value:
@@ -44,3 +68,23 @@ class RecipeFilter(FilterSet):
         if value:
             return queryset.filter(shopping__user=self.request.user)
         return queryset
+
+    def ingredients_filter(self, queryset, name, value):
+        """Рецепты, содержащие все указанные ингредиенты.
+
+        Реляционное деление: GROUP BY рецепту с HAVING по числу
+        совпавших ингредиентов, без размножения строк join-ами.
+        """
+        ingredients = set(value)
+        return queryset.filter(pk__in=RecipeIngredients.objects.filter(
+            ingredient__in=ingredients
+        ).values('recipe').annotate(
+            matched=Count('ingredient', distinct=True)
+        ).filter(matched=len(ingredients)).values('recipe'))
+
+    def exclude_ingredients_filter(self, queryset, name, value):
+        """Рецепты без указанных ингредиентов"""
+        return queryset.exclude(Exists(RecipeIngredients.objects.filter(
+            recipe=OuterRef('pk'),
+            ingredient__in=set(value)
+        )))
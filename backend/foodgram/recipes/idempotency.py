@@ -0,0 +1,77 @@
+import hashlib
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework import status
+from rest_framework.response import Response
+
+HEADER = 'HTTP_IDEMPOTENCY_KEY'
+MAX_KEY_LENGTH = 255
+
+
+def request_fingerprint(request):
+    """Хэш тела запроса: ключ нельзя повторить с другими данными"""
+    return hashlib.sha256(request.body).hexdigest()
+
+
+def idempotent(handler):
+    """Повтор POST с тем же заголовком Idempotency-Key получает
+    сохраненный ответ первого запроса без повторного выполнения.
+
+    Ответ хранится в кэше IDEMPOTENCY_KEY_TTL секунд отдельно для
+    каждого пользователя и адреса. Пока первый запрос выполняется,
+    повторы получают 409. Ответы 5xx не сохраняются, чтобы клиент
+    мог повторить запрос.
+    """
+
+    @wraps(handler)
+    def wrapper(self, request, *args, **kwargs):
+        key = request.META.get(HEADER)
+        if (key is None or request.method != 'POST'
+                or not request.user.is_authenticated):
+            return handler(self, request, *args, **kwargs)
+        if not key or len(key) > MAX_KEY_LENGTH:
+            return Response(
+                f'Idempotency-Key должен содержать от 1 до '
+                f'{MAX_KEY_LENGTH} символов',
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        cache_key = 'idempotency:{}:{}'.format(
+            request.user.pk,
+            hashlib.sha256(f'{request.path}|{key}'.encode()).hexdigest()
+        )
+        lock_key = f'{cache_key}:lock'
+        fingerprint = request_fingerprint(request)
+        stored = cache.get(cache_key)
+        if stored is None:
+            if not cache.add(lock_key, fingerprint,
+                             settings.IDEMPOTENCY_LOCK_TIMEOUT):
+                return Response(
+                    'Запрос с этим Idempotency-Key еще выполняется',
+                    status=status.HTTP_409_CONFLICT,
+                    headers={'Retry-After': '1'}
+                )
+            try:
+                # Первый запрос мог завершиться между get и add.
+                stored = cache.get(cache_key)
+                if stored is None:
+                    response = handler(self, request, *args, **kwargs)
+                    if response.status_code < 500:
+                        cache.set(cache_key, {
+                            'fingerprint': fingerprint,
+                            'status': response.status_code,
+                            'data': response.data,
+                        }, settings.IDEMPOTENCY_KEY_TTL)
+                    return response
+            finally:
+                cache.delete(lock_key)
+        if stored['fingerprint'] != fingerprint:
+            return Response(
+                'Idempotency-Key уже использован для другого запроса',
+                status=status.HTTP_422_UNPROCESSABLE_ENTITY
+            )
+        return Response(stored['data'], status=stored['status'],
+                        headers={'Idempotent-Replayed': 'true'})
+
+    return wrapper
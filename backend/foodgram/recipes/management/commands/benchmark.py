@@ -0,0 +1,90 @@
+import json
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.contrib.auth.models import AnonymousUser
+from django.db.models import Count
+from django.test import RequestFactory
+from recipes.filters import RecipeFilter
+from recipes.models import Recipe, RecipeIngredients
+from recipes.throttling import SlidingWindowThrottle
+from recipes.utils import percentile
+
+CASES = ('ingredient_filters', 'throttle')
+
+
+class BenchmarkThrottle(SlidingWindowThrottle):
+    scope = 'benchmark'
+
+    def get_rate(self, kind):
+        return '1000000/s'
+
+
+class Command(BaseCommand):
+    help = ('Микробенчмарки отдельных операций. Результат - JSON '
+            'с задержками для каждого набора параметров.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--case', action='append', choices=CASES,
+                            help='Какие замеры запускать (по умолчанию все)')
+        parser.add_argument('--iterations', type=int, default=50)
+        parser.add_argument('--output', help='Файл для JSON-отчета')
+
+    def measure(self, func):
+        timings = []
+        for _ in range(self.iterations):
+            started = time.perf_counter()
+            func()
+            timings.append(time.perf_counter() - started)
+        timings.sort()
+        return {
+            'p50_ms': round(percentile(timings, 50) * 1000, 3),
+            'p95_ms': round(percentile(timings, 95) * 1000, 3),
+            'max_ms': round(timings[-1] * 1000, 3),
+        }
+
+    def bench_ingredient_filters(self):
+        """Задержка фильтров по ингредиентам от числа ингредиентов"""
+        popular = list(RecipeIngredients.objects.values(
+            'ingredient'
+        ).annotate(
+            recipes=Count('recipe')
+        ).order_by('-recipes').values_list('ingredient', flat=True)[:16])
+        page_size = settings.REST_FRAMEWORK['PAGE_SIZE']
+        results = {}
+        for size in (1, 2, 4, 8, 16):
+            ids = ','.join(map(str, popular[:size]))
+            for name in ('ingredients', 'exclude_ingredients'):
+                def page(name=name, ids=ids):
+                    queryset = RecipeFilter(
+                        {name: ids}, queryset=Recipe.objects.all()
+                    ).qs
+                    queryset.count()
+                    list(queryset[:page_size])
+                results[f'{name}={size}'] = self.measure(page)
+        return results
+
+    def bench_throttle(self):
+        """Накладные расходы проверки лимита запросов на запрос"""
+        request = RequestFactory().get('/', HTTP_X_REAL_IP='10.0.0.1')
+        request.user = AnonymousUser()
+        throttle = BenchmarkThrottle()
+        return {
+            'baseline': self.measure(lambda: None),
+            'allow_request': self.measure(
+                lambda: throttle.allow_request(request, None)
+            ),
+        }
+
+    def handle(self, *args, **options):
+        self.iterations = options['iterations']
+        report = {
+            case: getattr(self, f'bench_{case}')()
+            for case in options['case'] or CASES
+        }
+        content = json.dumps(report, indent=2)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as f:
+                f.write(content)
+        self.stdout.write(content)
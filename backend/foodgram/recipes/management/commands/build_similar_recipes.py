@@ -0,0 +1,157 @@
+import heapq
+import math
+from array import array
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, Max, Min
+from django.utils import timezone
+from recipes.models import Recipe, RecipeIngredients, SimilarRecipe
+
+READ_CHUNK_SIZE = 10000
+
+
+def chunked(items, size):
+    items = list(items)
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+class SparseMatrix:
+    """Разреженная бинарная матрица рецепт × признак.
+
+    Хранит строки (признаки рецепта) и столбцы (рецепты с признаком),
+    столбцы - это инвертированный индекс для подсчета пересечений.
+    """
+
+    def __init__(self, pairs):
+        self.rows = defaultdict(set)
+        self.columns = defaultdict(lambda: array('q'))
+        for row, column in pairs:
+            self.rows[row].add(column)
+            self.columns[column].append(row)
+
+    def overlap(self, row):
+        """Строка произведения A·Aᵀ: число общих признаков с другими"""
+        counter = Counter()
+        for column in self.rows.get(row, ()):
+            counter.update(self.columns[column])
+        counter.pop(row, None)
+        return counter
+
+
+class Command(BaseCommand):
+    help = ('Предрасчет похожих рецептов по пересечению ингредиентов '
+            'и тегов')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--top-k', type=int,
+                            default=settings.SIMILAR_RECIPES_TOP_K)
+        parser.add_argument('--chunk-size', type=int, default=500)
+        parser.add_argument('--metric', choices=('cosine', 'jaccard'),
+                            default='cosine')
+        parser.add_argument('--tag-weight', type=float, default=0.2,
+                            help='Доля сходства по тегам в итоговой оценке')
+        parser.add_argument('--incremental', action='store_true',
+                            help='Пересчитать только рецепты, изменившиеся '
+                                 'с прошлого запуска, и их соседей')
+
+    def scores(self, recipe_id):
+        """Сходство рецепта со всеми рецептами, имеющими общий ингредиент"""
+        size = len(self.ingredients.rows.get(recipe_id, ()))
+        tags = self.tags.rows.get(recipe_id, set())
+        result = {}
+        for other, common in self.ingredients.overlap(recipe_id).items():
+            other_size = len(self.ingredients.rows[other])
+            if self.metric == 'cosine':
+                score = common / math.sqrt(size * other_size)
+            else:
+                score = common / (size + other_size - common)
+            if self.tag_weight:
+                other_tags = self.tags.rows.get(other, set())
+                union = len(tags | other_tags)
+                tag_score = len(tags & other_tags) / union if union else 0
+                score = ((1 - self.tag_weight) * score
+                         + self.tag_weight * tag_score)
+            result[other] = score
+        return result
+
+    def top_k(self, recipe_id):
+        return heapq.nlargest(
+            self.k, self.scores(recipe_id).items(), key=lambda item: item[1]
+        )
+
+    def affected_by(self, changed):
+        """Рецепты, в чьих топах могут появиться или измениться
+        изменившиеся рецепты."""
+        affected = set()
+        for chunk in chunked(changed, self.chunk_size):
+            affected.update(SimilarRecipe.objects.filter(
+                similar__in=chunk
+            ).values_list('recipe_id', flat=True))
+            best = {}
+            for recipe_id in chunk:
+                for other, score in self.scores(recipe_id).items():
+                    best[other] = max(score, best.get(other, 0))
+            for candidates in chunked(best, READ_CHUNK_SIZE):
+                thresholds = {
+                    row['recipe']: row
+                    for row in SimilarRecipe.objects.filter(
+                        recipe__in=candidates
+                    ).values('recipe').annotate(
+                        size=Count('pk'), lowest=Min('score')
+                    )
+                }
+                for other in candidates:
+                    row = thresholds.get(other)
+                    if (row is None or row['size'] < self.k
+                            or best[other] > row['lowest']):
+                        affected.add(other)
+        return affected
+
+    def handle(self, *args, **options):
+        self.k = options['top_k']
+        self.chunk_size = options['chunk_size']
+        self.metric = options['metric']
+        self.tag_weight = options['tag_weight']
+        started = timezone.now()
+
+        self.ingredients = SparseMatrix(
+            RecipeIngredients.objects.values_list(
+                'recipe_id', 'ingredient_id'
+            ).iterator(chunk_size=READ_CHUNK_SIZE)
+        )
+        self.tags = SparseMatrix(
+            Recipe.tags.through.objects.values_list(
+                'recipe_id', 'tag_id'
+            ).iterator(chunk_size=READ_CHUNK_SIZE)
+        )
+
+        last_run = SimilarRecipe.objects.aggregate(
+            last_run=Max('computed_at')
+        )['last_run']
+        if options['incremental'] and last_run:
+            changed = set(Recipe.objects.filter(
+                updated__gte=last_run
+            ).values_list('pk', flat=True))
+            targets = changed | self.affected_by(changed)
+        else:
+            targets = Recipe.objects.values_list('pk', flat=True)
+
+        total = 0
+        for chunk in chunked(targets, self.chunk_size):
+            rows = [
+                SimilarRecipe(recipe_id=recipe_id, similar_id=other,
+                              score=score, computed_at=started)
+                for recipe_id in chunk
+                for other, score in self.top_k(recipe_id)
+            ]
+            with transaction.atomic():
+                SimilarRecipe.objects.filter(recipe__in=chunk).delete()
+                SimilarRecipe.objects.bulk_create(rows)
+            total += len(chunk)
+        self.stdout.write(
+            self.style.SUCCESS(f'Пересчитаны похожие рецепты: {total}')
+        )
@@ -0,0 +1,44 @@
+from django.core.management.base import BaseCommand, CommandError
+from recipes.models import Recipe
+from recipes.snapshots import build_snapshots, refresh_snapshots
+
+
+class Command(BaseCommand):
+    help = ('Сверяет копии ингредиентов рецептов с таблицей '
+            'RecipeIngredients')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--fix', action='store_true',
+                            help='Пересобрать расходящиеся копии')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        rows = Recipe.all_objects.order_by('pk').values_list(
+            'pk', 'ingredients_snapshot'
+        )
+        checked = 0
+        mismatched = []
+        last_pk = 0
+        while True:
+            batch = dict(rows.filter(pk__gt=last_pk)[:batch_size])
+            if not batch:
+                break
+            last_pk = max(batch)
+            checked += len(batch)
+            expected = build_snapshots(list(batch))
+            stale = [pk for pk, snapshot in batch.items()
+                     if snapshot != expected[pk]]
+            if stale and options['fix']:
+                refresh_snapshots(stale, batch_size)
+            mismatched.extend(stale)
+        self.stdout.write(f'Проверено рецептов: {checked}, '
+                          f'расхождений: {len(mismatched)}')
+        if mismatched and not options['fix']:
+            raise CommandError(
+                'Копии ингредиентов расходятся у рецептов: '
+                + ', '.join(map(str, mismatched[:20]))
+                + (' ...' if len(mismatched) > 20 else '')
+            )
+        if mismatched:
+            self.stdout.write(self.style.SUCCESS('Копии пересобраны'))
@@ -0,0 +1,81 @@
+import itertools
+import os
+import shutil
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from recipes.deletion import referenced
+
+
+def walk_files(root, skip):
+    """Обходит дерево через os.scandir, выдавая (имя, путь, mtime).
+
+    Имена возвращаются относительно root в том виде, в котором
+    они хранятся в полях ImageField.
+    """
+    stack = [root]
+    while stack:
+        directory = stack.pop()
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    if entry.path != skip:
+                        stack.append(entry.path)
+                elif entry.is_file(follow_symlinks=False):
+                    name = os.path.relpath(entry.path, root)
+                    yield (name.replace(os.sep, '/'), entry.path,
+                           entry.stat(follow_symlinks=False).st_mtime)
+
+
+class Command(BaseCommand):
+    help = ('Поиск и удаление медиафайлов, на которые не ссылаются '
+            'рецепты и пользователи')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--grace-hours', type=float, default=24,
+                            help='Не трогать файлы моложе указанного срока')
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--quarantine',
+                            help='Переносить файлы в каталог вместо удаления')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Только вывести найденные файлы')
+
+    def handle(self, *args, **options):
+        root = os.path.abspath(settings.MEDIA_ROOT)
+        if not os.path.isdir(root):
+            raise CommandError(f'Каталог {root} не найден')
+        quarantine = options['quarantine']
+        if quarantine:
+            quarantine = os.path.abspath(quarantine)
+        deadline = time.time() - options['grace_hours'] * 3600
+        files = (
+            item for item in walk_files(root, quarantine)
+            if item[2] < deadline
+        )
+        checked = orphans = size = 0
+        while True:
+            batch = {
+                name: path for name, path, _ in
+                itertools.islice(files, options['batch_size'])
+            }
+            if not batch:
+                break
+            checked += len(batch)
+            for name in batch.keys() - referenced(list(batch)):
+                path = batch[name]
+                orphans += 1
+                size += os.path.getsize(path)
+                if options['dry_run']:
+                    self.stdout.write(name)
+                elif quarantine:
+                    target = os.path.join(quarantine, name)
+                    os.makedirs(os.path.dirname(target), exist_ok=True)
+                    shutil.move(path, target)
+                else:
+                    os.remove(path)
+        self.stdout.write(self.style.SUCCESS(
+            f'Проверено файлов: {checked}, без ссылок: {orphans} '
+            f'({size / 2 ** 20:.1f} МБ)'
+            + (', ничего не изменено' if options['dry_run'] else '')
+        ))
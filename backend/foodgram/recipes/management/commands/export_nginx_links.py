@@ -0,0 +1,44 @@
+import os
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from recipes.models import Link
+from recipes.shortlinks import frontend_url
+
+
+class Command(BaseCommand):
+    help = ('Выгружает короткие ссылки в файл для директивы map nginx, '
+            'после выгрузки nginx нужно перезагрузить (nginx -s reload)')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', default=settings.SHORT_LINKS_MAP_PATH,
+                            help='Файл карты, "-" для вывода в консоль')
+        parser.add_argument('--batch-size', type=int, default=5000)
+
+    def write_map(self, f, batch_size):
+        rows = Link.objects.filter(
+            recipe__deleted_at__isnull=True
+        ).order_by('pk').values_list('short_link', 'original_url')
+        total = 0
+        for short_link, original_url in rows.iterator(chunk_size=batch_size):
+            path = urlsplit(short_link).path.rstrip('/')
+            target = frontend_url(original_url)
+            if '"' in path + target or ' ' in path:
+                continue
+            # Выданные ссылки без слеша, но в ходу и адреса со слешем.
+            f.write(f'{path} "{target}";\n{path}/ "{target}";\n')
+            total += 1
+        return total
+
+    def handle(self, *args, **options):
+        output = str(options['output'])
+        if output == '-':
+            self.write_map(self.stdout, options['batch_size'])
+            return
+        os.makedirs(os.path.dirname(output) or '.', exist_ok=True)
+        # Запись во временный файл, чтобы nginx не прочитал половину карты.
+        with open(f'{output}.tmp', 'w', encoding='utf-8') as f:
+            total = self.write_map(f, options['batch_size'])
+        os.replace(f'{output}.tmp', output)
+        self.stdout.write(f'Ссылок в карте: {total}, файл: {output}')
@@ -0,0 +1,75 @@
+import json
+import sys
+import tarfile
+
+from django.core.management.base import BaseCommand
+from recipes.models import Recipe
+
+
+def recipe_to_dict(recipe):
+    author = recipe.author
+    return {
+        'name': recipe.name,
+        'text': recipe.text,
+        'cooking_time': recipe.cooking_time,
+        'pub_date': recipe.pub_date.isoformat(),
+        'image': recipe.image.name,
+        'author': {
+            'email': author.email,
+            'username': author.username,
+            'first_name': author.first_name,
+            'last_name': author.last_name,
+        },
+        'tags': [
+            {'name': tag.name, 'slug': tag.slug}
+            for tag in recipe.tags.all()
+        ],
+        'ingredients': [
+            {
+                'name': item.ingredient.name,
+                'measurement_unit': item.ingredient.measurement_unit,
+                'amount': item.amount,
+            }
+            for item in recipe.ingredient_in_recipe.all()
+        ],
+    }
+
+
+class Command(BaseCommand):
+    help = ('Выгрузка рецептов в NDJSON (по рецепту в строке) '
+            'и архив с картинками')
+
+    def add_arguments(self, parser):
+        parser.add_argument('output', help='Файл NDJSON или - для stdout')
+        parser.add_argument('--media', help='Архив tar.gz для картинок')
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        recipes = Recipe.objects.select_related('author').prefetch_related(
+            'tags', 'ingredient_in_recipe__ingredient'
+        ).order_by('pk').iterator(chunk_size=options['batch_size'])
+        output = (sys.stdout if options['output'] == '-'
+                  else open(options['output'], 'w', encoding='utf-8'))
+        archive = (tarfile.open(options['media'], 'w:gz')
+                   if options['media'] else None)
+        exported = missing = 0
+        try:
+            for recipe in recipes:
+                output.write(json.dumps(recipe_to_dict(recipe),
+                                        ensure_ascii=False) + '\n')
+                exported += 1
+                if archive is None or not recipe.image:
+                    continue
+                try:
+                    archive.add(recipe.image.path, arcname=recipe.image.name)
+                except FileNotFoundError:
+                    missing += 1
+        finally:
+            if output is not sys.stdout:
+                output.close()
+            if archive is not None:
+                archive.close()
+        self.stderr.write(self.style.SUCCESS(
+            f'Выгружено рецептов: {exported}, '
+            f'картинок не найдено: {missing}'
+        ))
@@ -0,0 +1,137 @@
+import json
+import posixpath
+import tarfile
+from datetime import datetime
+
+from django.contrib.auth.hashers import make_password
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from recipes.changelog import CREATE, log_changes
+from recipes.models import Ingredient, Recipe, RecipeIngredients, Tag
+from users.models import User
+
+
+class Command(BaseCommand):
+    help = ('Загрузка рецептов из NDJSON, выгруженного export_recipes, '
+            'пакетами через bulk_create')
+
+    def add_arguments(self, parser):
+        parser.add_argument('input', help='Файл NDJSON')
+        parser.add_argument('--media', help='Архив с картинками')
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def extract_media(self, path):
+        """Потоково распаковывает архив в хранилище медиафайлов"""
+        extracted = 0
+        with tarfile.open(path, 'r|*') as archive:
+            for member in archive:
+                name = posixpath.normpath(member.name)
+                if (not member.isfile() or name.startswith(('/', '..'))
+                        or default_storage.exists(name)):
+                    continue
+                default_storage.save(name, File(archive.extractfile(member)))
+                extracted += 1
+        return extracted
+
+    def get_authors(self, rows):
+        emails = {row['author']['email'] for row in rows}
+        authors = {
+            user.email: user.pk
+            for user in User.objects.filter(email__in=emails)
+        }
+        new_authors = {
+            row['author']['email']: User(password=make_password(None),
+                                         **row['author'])
+            for row in rows if row['author']['email'] not in authors
+        }
+        for user in User.objects.bulk_create(new_authors.values()):
+            authors[user.email] = user.pk
+        return authors
+
+    def get_tag(self, tag):
+        if tag['slug'] not in self.tags:
+            self.tags[tag['slug']] = Tag.objects.get_or_create(
+                slug=tag['slug'], defaults={'name': tag['name']}
+            )[0].pk
+        return self.tags[tag['slug']]
+
+    def get_ingredient(self, item):
+        key = (item['name'], item['measurement_unit'])
+        if key not in self.ingredients:
+            self.ingredients[key] = Ingredient.objects.create(
+                name=item['name'], measurement_unit=item['measurement_unit']
+            ).pk
+        return self.ingredients[key]
+
+    def get_snapshot(self, row):
+        return [{'id': self.get_ingredient(item),
+                 'name': item['name'],
+                 'measurement_unit': item['measurement_unit'],
+                 'amount': item['amount']}
+                for item in row['ingredients']]
+
+    @transaction.atomic
+    def import_batch(self, rows):
+        authors = self.get_authors(rows)
+        recipes = Recipe.objects.bulk_create(
+            Recipe(author_id=authors[row['author']['email']],
+                   name=row['name'],
+                   text=row['text'],
+                   cooking_time=row['cooking_time'],
+                   image=row['image'],
+                   ingredients_snapshot=self.get_snapshot(row))
+            for row in rows
+        )
+        # pub_date заполняется автоматически при вставке,
+        # дату из выгрузки восстанавливаем отдельным запросом.
+        for recipe, row in zip(recipes, rows):
+            recipe.pub_date = datetime.fromisoformat(row['pub_date'])
+        Recipe.objects.bulk_update(recipes, ('pub_date',))
+        RecipeIngredients.objects.bulk_create(
+            RecipeIngredients(recipe=recipe,
+                              ingredient_id=self.get_ingredient(item),
+                              amount=item['amount'])
+            for recipe, row in zip(recipes, rows)
+            for item in row['ingredients']
+        )
+        Recipe.tags.through.objects.bulk_create(
+            Recipe.tags.through(recipe=recipe, tag_id=self.get_tag(tag))
+            for recipe, row in zip(recipes, rows)
+            for tag in row['tags']
+        )
+        # bulk_create не отправляет сигналы, журнал пишем сами.
+        log_changes('recipe', (recipe.pk for recipe in recipes), CREATE)
+
+    def handle(self, *args, **options):
+        if options['media']:
+            extracted = self.extract_media(options['media'])
+            self.stdout.write(f'Распаковано картинок: {extracted}')
+        self.tags = dict(Tag.objects.values_list('slug', 'pk'))
+        self.ingredients = {
+            (name, unit): pk
+            for pk, name, unit in Ingredient.objects.values_list(
+                'pk', 'name', 'measurement_unit'
+            )
+        }
+        imported = 0
+        batch = []
+        with open(options['input'], encoding='utf-8') as f:
+            for number, line in enumerate(f, 1):
+                if not line.strip():
+                    continue
+                try:
+                    batch.append(json.loads(line))
+                except ValueError:
+                    raise CommandError(f'Строка {number}: некорректный JSON')
+                if len(batch) >= options['batch_size']:
+                    self.import_batch(batch)
+                    imported += len(batch)
+                    batch = []
+        if batch:
+            self.import_batch(batch)
+            imported += len(batch)
+        self.stdout.write(
+            self.style.SUCCESS(f'Загружено рецептов: {imported}')
+        )
@@ -0,0 +1,265 @@
+import json
+import random
+import re
+import threading
+import time
+import uuid
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from recipes.utils import percentile
+
+DEFAULT_COLLECTION = (
+    settings.BASE_DIR.parent.parent
+    / 'postman_collection/foodgram.postman_collection.json'
+)
+VARIABLE = re.compile(r'{{(\w+)}}')
+
+# Сценарии нагрузки: вес и последовательность запросов из коллекции.
+# captures сохраняет поле ответа в переменную виртуального пользователя.
+SCENARIOS = {
+    'anonymous_browsing': {
+        'weight': 6,
+        'steps': (
+            ('get_tag_list // No Auth', {}),
+            ('get_recipes_list // No Auth', {}),
+            ('get_recipe_detail // No Auth', {}),
+        ),
+    },
+    'favoriting': {
+        'weight': 3,
+        'steps': (
+            ('get_recipes_list // User', {}),
+            ('add_to_favorite // User', {}),
+            ('get_recipes_list_with_is_favorited_param // User', {}),
+            ('remove_from_favorite // User', {}),
+        ),
+    },
+    'shopping_cart': {
+        'weight': 1,
+        'steps': (
+            ('add_to_shopping_cart // User', {}),
+            ('download_shopping_cart // User', {}),
+            ('remove_from_shopping_cart // User', {}),
+        ),
+    },
+    'recipe_creation': {
+        'weight': 1,
+        'steps': (
+            ('create_fifth_recipe // User', {'fifthRecipeId': 'id'}),
+            ('delete_fifth_recipe // Second User', {}),
+        ),
+    },
+}
+
+# Подготовка виртуального пользователя: регистрация, токен, свой рецепт.
+SETUP_STEPS = (
+    ('create_first_user', {'userId': 'id'}),
+    ('get_token_for_first_user', {'userToken': 'auth_token'}),
+    ('create_fifth_recipe // User', {'firstRecipeId': 'id'}),
+)
+
+
+def load_collection(path):
+    """Разворачивает коллекцию в словарь запросов по имени с учетом
+    унаследованной от папок авторизации."""
+    with open(path, encoding='utf-8') as f:
+        collection = json.load(f)
+    variables = {
+        item['key']: item['value']
+        for item in collection.get('variable', ())
+    }
+    requests_by_name = {}
+
+    def walk(items, auth):
+        for item in items:
+            if 'item' in item:
+                walk(item['item'], item.get('auth', auth))
+                continue
+            request = item['request']
+            raw = request['url']['raw']
+            requests_by_name.setdefault(item['name'], {
+                'method': request['method'],
+                'url': raw,
+                'label': '{} {}'.format(
+                    request['method'],
+                    VARIABLE.sub('{id}', raw.replace('{{baseUrl}}', ''))
+                ),
+                'body': (request.get('body') or {}).get('raw'),
+                'auth': request.get('auth', auth),
+            })
+
+    walk(collection['item'], collection.get('auth'))
+    return requests_by_name, variables
+
+
+class VirtualUser:
+    """Пользователь со своей сессией и набором переменных коллекции"""
+
+    def __init__(self, command, variables, address):
+        self.command = command
+        self.session = requests.Session()
+        # Отдельный адрес для каждого пользователя, чтобы ограничения
+        # частоты по IP работали как для независимых клиентов.
+        self.session.headers['X-Real-IP'] = address
+        self.variables = dict(variables)
+        suffix = uuid.uuid4().hex[:12]
+        self.variables.update({
+            'email': json.dumps(f'load-{suffix}@example.org'),
+            'username': json.dumps(f'load-{suffix}'),
+        })
+
+    def render(self, template):
+        def replace(match):
+            return str(self.variables.get(match.group(1), match.group(0)))
+        return VARIABLE.sub(replace, template)
+
+    def headers(self, auth):
+        headers = {'Content-Type': 'application/json'}
+        if auth and auth.get('type') == 'apikey':
+            options = {item['key']: item['value'] for item in auth['apikey']}
+            headers[options.get('key', 'Authorization')] = self.render(
+                options.get('value', '')
+            )
+        return headers
+
+    def run(self, name, captures):
+        request = self.command.requests[name]
+        body = request['body']
+        started = time.perf_counter()
+        try:
+            response = self.session.request(
+                request['method'],
+                self.render(request['url']),
+                data=self.render(body).encode() if body else None,
+                headers=self.headers(request['auth']),
+                timeout=self.command.timeout,
+            )
+            ok = response.status_code < 400
+        except requests.RequestException:
+            response, ok = None, False
+        self.command.record(
+            request['label'], time.perf_counter() - started, ok
+        )
+        if ok and captures:
+            data = response.json()
+            for variable, field in captures.items():
+                self.variables[variable] = data[field]
+        return ok
+
+
+class Command(BaseCommand):
+    help = ('Нагрузочное тестирование API по сценариям из postman-коллекции. '
+            'Результат - JSON с пропускной способностью и задержками.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--base-url', default='http://127.0.0.1:8000')
+        parser.add_argument('--collection', default=str(DEFAULT_COLLECTION))
+        parser.add_argument('--concurrency', type=int, default=10)
+        parser.add_argument('--duration', type=float, default=30,
+                            help='Длительность прогона в секундах')
+        parser.add_argument('--timeout', type=float, default=30)
+        parser.add_argument('--scenario', action='append',
+                            choices=sorted(SCENARIOS),
+                            help='Ограничить прогон выбранными сценариями')
+        parser.add_argument('--seed', type=int, default=None)
+        parser.add_argument('--output', help='Файл для JSON-отчета')
+
+    def record(self, label, elapsed, ok):
+        with self.lock:
+            self.timings[label].append(elapsed)
+            if not ok:
+                self.errors[label] += 1
+
+    def worker(self, number, deadline, scenarios, seed):
+        rng = random.Random(seed)
+        user = VirtualUser(
+            self, self.variables, f'10.0.{number // 256}.{number % 256}'
+        )
+        for name, captures in SETUP_STEPS:
+            if not user.run(name, captures):
+                raise CommandError(f'Не удалось выполнить {name}')
+        weights = [SCENARIOS[name]['weight'] for name in scenarios]
+        while time.monotonic() < deadline:
+            scenario = rng.choices(scenarios, weights)[0]
+            for name, captures in SCENARIOS[scenario]['steps']:
+                if not user.run(name, captures):
+                    break
+        user.variables['fifthRecipeId'] = user.variables['firstRecipeId']
+        user.run('delete_fifth_recipe // Second User', {})
+
+    def discover(self):
+        """Подставляет в переменные коллекции реальные теги и ингредиенты"""
+        session = requests.Session()
+        base_url = self.variables['baseUrl']
+        tags = session.get(f'{base_url}/api/tags/').json()
+        ingredients = session.get(f'{base_url}/api/ingredients/').json()
+        if len(tags) < 3 or len(ingredients) < 2:
+            raise CommandError('Нужно как минимум 3 тега и 2 ингредиента')
+        self.variables.update({
+            'firstTagId': tags[0]['id'],
+            'secondTagId': tags[1]['id'],
+            'thirdTagId': tags[2]['id'],
+            'secondTagSlug': tags[1]['slug'],
+            'thirdTagSlug': tags[2]['slug'],
+            'firstIndredientId': ingredients[0]['id'],
+            'secondIndredientId': ingredients[1]['id'],
+            'ingredientNameFirstLatter': ingredients[0]['name'][:1],
+        })
+
+    def handle(self, *args, **options):
+        self.requests, self.variables = load_collection(options['collection'])
+        self.variables['baseUrl'] = options['base_url'].rstrip('/')
+        self.timeout = options['timeout']
+        self.lock = threading.Lock()
+        self.timings = defaultdict(list)
+        self.errors = defaultdict(int)
+        scenarios = options['scenario'] or sorted(SCENARIOS)
+        self.discover()
+
+        seed = options['seed']
+        started = time.monotonic()
+        deadline = started + options['duration']
+        with ThreadPoolExecutor(options['concurrency']) as executor:
+            futures = [
+                executor.submit(
+                    self.worker, number, deadline, scenarios,
+                    None if seed is None else seed + number
+                )
+                for number in range(options['concurrency'])
+            ]
+            for future in futures:
+                future.result()
+        elapsed = time.monotonic() - started
+
+        endpoints = {}
+        for label, values in sorted(self.timings.items()):
+            values.sort()
+            endpoints[label] = {
+                'requests': len(values),
+                'errors': self.errors[label],
+                'rps': round(len(values) / elapsed, 2),
+                'p50_ms': round(percentile(values, 50) * 1000, 2),
+                'p95_ms': round(percentile(values, 95) * 1000, 2),
+                'p99_ms': round(percentile(values, 99) * 1000, 2),
+                'max_ms': round(values[-1] * 1000, 2),
+            }
+        total = sum(item['requests'] for item in endpoints.values())
+        report = {
+            'base_url': self.variables['baseUrl'],
+            'scenarios': scenarios,
+            'concurrency': options['concurrency'],
+            'duration_s': round(elapsed, 2),
+            'requests': total,
+            'errors': sum(self.errors.values()),
+            'throughput_rps': round(total / elapsed, 2),
+            'endpoints': endpoints,
+        }
+        content = json.dumps(report, ensure_ascii=False, indent=2)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as f:
+                f.write(content)
+        self.stdout.write(content)
@@ -0,0 +1,131 @@
+import json
+import os
+import re
+import subprocess
+import sys
+from collections import Counter
+
+from django.core.management.base import BaseCommand, CommandError
+
+# Выполняется в отдельном процессе, чтобы импорты были холодными.
+CHILD_SCRIPT = '''
+import io
+import json
+import sys
+import time
+
+started = time.perf_counter()
+import django
+django.setup()
+setup = time.perf_counter()
+
+from django.conf import settings
+from django.core.servers.basehttp import get_internal_wsgi_application
+
+handler = get_internal_wsgi_application()
+loaded = time.perf_counter()
+status = []
+environ = {
+    'REQUEST_METHOD': 'GET',
+    'PATH_INFO': sys.argv[1],
+    'QUERY_STRING': '',
+    'SERVER_NAME': settings.ALLOWED_HOSTS[0].lstrip('.') or 'localhost',
+    'SERVER_PORT': '80',
+    'SERVER_PROTOCOL': 'HTTP/1.1',
+    'wsgi.url_scheme': 'http',
+    'wsgi.input': io.BytesIO(),
+    'wsgi.errors': sys.stderr,
+}
+body = handler(environ, lambda code, headers: status.append(code))
+b''.join(body)
+finished = time.perf_counter()
+print(json.dumps({
+    'setup_ms': (setup - started) * 1000,
+    'wsgi_ms': (loaded - setup) * 1000,
+    'first_request_ms': (finished - loaded) * 1000,
+    'total_ms': (finished - started) * 1000,
+    'status': status[0],
+}))
+'''
+IMPORT_LINE = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \|( +)(\S+)$')
+
+
+def parse_importtime(lines):
+    """Время импорта из вывода -X importtime (в миллисекундах)"""
+    total = 0
+    packages = Counter()
+    modules = []
+    for line in lines:
+        match = IMPORT_LINE.match(line)
+        if not match:
+            continue
+        own, cumulative, indent, name = match.groups()
+        own, cumulative = int(own) / 1000, int(cumulative) / 1000
+        packages[name.split('.')[0]] += own
+        if len(indent) == 1:
+            total += cumulative
+            modules.append((name, cumulative))
+    return total, packages, modules
+
+
+class Command(BaseCommand):
+    help = ('Время запуска воркера: импорты по данным -X importtime, '
+            'django.setup() и первый запрос')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--path', default='/api/tags/',
+                            help='Адрес первого запроса')
+        parser.add_argument('--top', type=int, default=15)
+        parser.add_argument('--max-import-ms', type=float,
+                            help='Завершиться с ошибкой, если импорты '
+                                 'дольше заданного времени')
+        parser.add_argument('--json', action='store_true')
+
+    def handle(self, *args, **options):
+        result = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', CHILD_SCRIPT,
+             options['path']],
+            capture_output=True, text=True, env=os.environ.copy()
+        )
+        if result.returncode:
+            raise CommandError(result.stderr[-2000:])
+        timings = json.loads(result.stdout.strip().splitlines()[-1])
+        total, packages, modules = parse_importtime(
+            result.stderr.splitlines()
+        )
+        report = {
+            'import_ms': round(total, 1),
+            **{key: round(value, 1) if key != 'status' else value
+               for key, value in timings.items()},
+            'packages': {
+                name: round(ms, 1)
+                for name, ms in packages.most_common(options['top'])
+            },
+            'modules': {
+                name: round(ms, 1)
+                for name, ms in sorted(modules, key=lambda item: item[1],
+                                       reverse=True)[:options['top']]
+            },
+        }
+        if options['json']:
+            self.stdout.write(json.dumps(report, indent=2))
+        else:
+            self.stdout.write(
+                f'Импорты: {report["import_ms"]} мс, '
+                f'django.setup(): {report["setup_ms"]} мс, '
+                f'WSGI_APPLICATION: {report["wsgi_ms"]} мс, '
+                f'первый запрос {options["path"]} '
+                f'({report["status"]}): {report["first_request_ms"]} мс, '
+                f'всего: {report["total_ms"]} мс'
+            )
+            self.stdout.write('Собственное время импорта по пакетам, мс:')
+            for name, ms in report['packages'].items():
+                self.stdout.write(f'{ms:>10}  {name}')
+            self.stdout.write('Модули верхнего уровня с импортами, мс:')
+            for name, ms in report['modules'].items():
+                self.stdout.write(f'{ms:>10}  {name}')
+        limit = options['max_import_ms']
+        if limit is not None and total > limit:
+            raise CommandError(
+                f'Импорты занимают {total:.1f} мс, допустимо {limit} мс'
+            )
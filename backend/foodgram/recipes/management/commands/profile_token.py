@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+from foodgram.profiling import make_token
+
+
+class Command(BaseCommand):
+    help = ('Токен для заголовка X-Profile, включающего профилирование '
+            'запроса')
+
+    def handle(self, *args, **options):
+        self.stdout.write(make_token())
@@ -0,0 +1,25 @@
+import time
+
+from django.core.management.base import BaseCommand
+from recipes.deletion import purge_deleted
+
+
+class Command(BaseCommand):
+    help = ('Фоновое удаление помеченных рецептов и пользователей '
+            'небольшими порциями вместе с медиафайлами')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=500)
+        parser.add_argument('--loop', action='store_true',
+                            help='Работать постоянно, проверяя очередь')
+        parser.add_argument('--interval', type=float, default=10,
+                            help='Пауза между проверками в режиме --loop')
+
+    def handle(self, *args, **options):
+        while True:
+            purged = purge_deleted(options['chunk_size'])
+            if purged:
+                self.stdout.write(f'Удалено объектов: {purged}')
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
@@ -0,0 +1,25 @@
+import time
+
+from django.core.management.base import BaseCommand
+from recipes.popular import rollup
+
+
+class Command(BaseCommand):
+    help = ('Пересчет рейтинга популярных рецептов по почасовым '
+            'счетчикам избранного и покупок')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--size', type=int,
+                            help='Длина рейтинга каждого окна')
+        parser.add_argument('--loop', action='store_true',
+                            help='Пересчитывать постоянно')
+        parser.add_argument('--interval', type=float, default=300,
+                            help='Пауза между пересчетами в режиме --loop')
+
+    def handle(self, *args, **options):
+        while True:
+            rollup(options['size'])
+            self.stdout.write('Рейтинг популярных рецептов обновлен')
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
@@ -0,0 +1,208 @@
+import csv
+import io
+import itertools
+import random
+from datetime import datetime, timedelta, timezone
+
+from django.contrib.auth.hashers import make_password
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from recipes.models import (Favorite, Ingredient, Recipe, RecipeIngredients,
+                            ShoppingCart, Tag)
+from recipes.snapshots import refresh_snapshots
+from users.models import Subscription, User
+
+PLACEHOLDER_IMAGE = 'recipes/perf-placeholder.png'
+PLACEHOLDER_PNG = bytes.fromhex(
+    '89504e470d0a1a0a0000000d4948445200000001000000010802000000'
+    '907753de0000000c49444154789c63f8ffff3f0005fe02fe0def46b800'
+    '00000049454e44ae426082'
+)
+START_DATE = datetime(2024, 1, 1, tzinfo=timezone.utc)
+DEFAULT_TAGS = (('Завтрак', 'breakfast'), ('Обед', 'lunch'),
+                ('Ужин', 'dinner'))
+
+
+class PowerLaw:
+    """Выбор элементов с вероятностью, убывающей по степенному закону"""
+
+    def __init__(self, items, exponent, rng):
+        self.items = items
+        self.rng = rng
+        self.cum_weights = list(itertools.accumulate(
+            1 / rank ** exponent for rank in range(1, len(items) + 1)
+        ))
+
+    def choice(self):
+        return self.rng.choices(self.items, cum_weights=self.cum_weights)[0]
+
+    def sample(self, size, exclude=None):
+        """Набор различных элементов заданного размера"""
+        size = min(size, len(self.items) - (exclude is not None))
+        result = set()
+        while len(result) < size:
+            item = self.choice()
+            if item != exclude:
+                result.add(item)
+        return result
+
+
+class TableWriter:
+    """Пакетная вставка строк: COPY для PostgreSQL,
+    executemany для остальных СУБД."""
+
+    def __init__(self, batch_size):
+        self.batch_size = batch_size
+
+    def write(self, model, fields, rows):
+        table = model._meta.db_table
+        columns = [model._meta.get_field(name).column for name in fields]
+        quoted = ', '.join(map(connection.ops.quote_name, columns))
+        total = 0
+        while True:
+            batch = list(itertools.islice(rows, self.batch_size))
+            if not batch:
+                return total
+            with transaction.atomic(), connection.cursor() as cursor:
+                if connection.vendor == 'postgresql':
+                    buffer = io.StringIO()
+                    csv.writer(buffer).writerows(batch)
+                    buffer.seek(0)
+                    cursor.copy_expert(
+                        f'COPY {table} ({quoted}) FROM STDIN WITH CSV',
+                        buffer
+                    )
+                else:
+                    placeholders = ', '.join(['%s'] * len(columns))
+                    cursor.executemany(
+                        f'INSERT INTO {table} ({quoted}) '
+                        f'VALUES ({placeholders})',
+                        batch
+                    )
+            total += len(batch)
+
+
+def quotas(total, owners, exponent, rng):
+    """Распределяет total действий между владельцами по степенному закону"""
+    owners = list(owners)
+    rng.shuffle(owners)
+    weights = [1 / rank ** exponent for rank in range(1, len(owners) + 1)]
+    scale = total / sum(weights)
+    return zip(owners, (round(weight * scale) for weight in weights))
+
+
+class Command(BaseCommand):
+    help = ('Детерминированная генерация данных для нагрузочного '
+            'тестирования: пользователи, рецепты, избранное, покупки, '
+            'подписки')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--recipes', type=int, default=10000)
+        parser.add_argument('--favorites', type=int, default=50000)
+        parser.add_argument('--cart', type=int, default=20000)
+        parser.add_argument('--subscriptions', type=int, default=20000)
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--exponent', type=float, default=1.1,
+                            help='Показатель степенного закона популярности')
+        parser.add_argument('--batch-size', type=int, default=10000)
+
+    def handle(self, *args, **options):
+        ingredient_ids = list(
+            Ingredient.objects.order_by('pk').values_list('pk', flat=True)
+        )
+        if not ingredient_ids:
+            raise CommandError('Сначала загрузите ингредиенты: import_data')
+        if not Tag.objects.exists():
+            Tag.objects.bulk_create(
+                Tag(name=name, slug=slug) for name, slug in DEFAULT_TAGS
+            )
+        tag_ids = list(
+            Tag.objects.order_by('pk').values_list('pk', flat=True)
+        )
+        if not default_storage.exists(PLACEHOLDER_IMAGE):
+            default_storage.save(PLACEHOLDER_IMAGE,
+                                 ContentFile(PLACEHOLDER_PNG))
+
+        seed = options['seed']
+        exponent = options['exponent']
+        rng = random.Random(seed)
+        writer = TableWriter(options['batch_size'])
+        prefix = f'perf{seed}_'
+
+        password = make_password('perf-password')
+        created = writer.write(User, (
+            'password', 'is_superuser', 'username', 'first_name',
+            'last_name', 'email', 'is_staff', 'is_active', 'date_joined',
+            'avatar'
+        ), (
+            (password, False, f'{prefix}{number}', 'Perf', str(number),
+             f'{prefix}{number}@example.org', False, True, START_DATE, '')
+            for number in range(options['users'])
+        ))
+        self.stdout.write(f'Пользователи: {created}')
+        user_ids = list(User.objects.filter(
+            username__startswith=prefix
+        ).order_by('pk').values_list('pk', flat=True))
+
+        authors = PowerLaw(user_ids, exponent, rng)
+        step = timedelta(days=365) / max(options['recipes'], 1)
+        created = writer.write(Recipe, (
+            'author', 'name', 'image', 'text', 'cooking_time', 'pub_date',
+            'updated', 'in_timelines', 'version', 'ingredients_snapshot'
+        ), (
+            (authors.choice(), f'Рецепт {prefix}{number}', PLACEHOLDER_IMAGE,
+             'Сгенерированный рецепт', rng.randint(5, 180),
+             START_DATE + step * number, START_DATE + step * number, False,
+             1, '[]')
+            for number in range(options['recipes'])
+        ))
+        self.stdout.write(f'Рецепты: {created}')
+        recipe_ids = list(Recipe.objects.filter(
+            author__username__startswith=prefix
+        ).order_by('pk').values_list('pk', flat=True))
+
+        ingredients = PowerLaw(ingredient_ids, exponent, rng)
+        created = writer.write(RecipeIngredients, (
+            'recipe', 'ingredient', 'amount'
+        ), (
+            (recipe_id, ingredient_id, rng.randint(1, 500))
+            for recipe_id in recipe_ids
+            for ingredient_id in sorted(ingredients.sample(
+                round(rng.triangular(2, 15, 7))
+            ))
+        ))
+        self.stdout.write(f'Ингредиенты рецептов: {created}')
+        refresh_snapshots(recipe_ids, options['batch_size'])
+
+        created = writer.write(Recipe.tags.through, ('recipe', 'tag'), (
+            (recipe_id, tag_id)
+            for recipe_id in recipe_ids
+            for tag_id in sorted(rng.sample(
+                tag_ids, rng.randint(1, min(3, len(tag_ids)))
+            ))
+        ))
+        self.stdout.write(f'Теги рецептов: {created}')
+
+        recipes = PowerLaw(recipe_ids, exponent, rng)
+        for model, total in ((Favorite, options['favorites']),
+                             (ShoppingCart, options['cart'])):
+            created = writer.write(model, ('user', 'recipe'), (
+                (user_id, recipe_id)
+                for user_id, size in quotas(total, user_ids, exponent, rng)
+                for recipe_id in sorted(recipes.sample(size))
+            ))
+            self.stdout.write(
+                f'{model._meta.verbose_name_plural}: {created}'
+            )
+
+        created = writer.write(Subscription, ('user', 'author'), (
+            (user_id, author_id)
+            for user_id, size in quotas(options['subscriptions'], user_ids,
+                                        exponent, rng)
+            for author_id in sorted(authors.sample(size, exclude=user_id))
+        ))
+        self.stdout.write(f'Подписки: {created}')
+        self.stdout.write(self.style.SUCCESS('Готово'))
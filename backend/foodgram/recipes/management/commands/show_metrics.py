@@ -0,0 +1,11 @@
+import json
+
+from django.core.management.base import BaseCommand
+from foodgram.metrics import snapshot
+
+
+class Command(BaseCommand):
+    help = 'Счетчики приложения из общего кэша в формате JSON'
+
+    def handle(self, *args, **options):
+        self.stdout.write(json.dumps(snapshot(), indent=2))
@@ -0,0 +1,100 @@
+import glob
+import json
+import os
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from foodgram.sqlstats import new_generation
+from recipes.utils import percentile
+
+SORT_KEYS = ('total_ms', 'count', 'p95_ms', 'max_ms')
+
+
+def merge(rows, by_view):
+    """Объединяет статистику процессов по отпечатку (и представлению)"""
+    merged = {}
+    for row in rows:
+        key = (row['fingerprint'], row['view'] if by_view else None)
+        item = merged.setdefault(key, {
+            'fingerprint': row['fingerprint'], 'views': set(),
+            'count': 0, 'total_ms': 0.0, 'max_ms': 0.0, 'samples': [],
+        })
+        item['views'].add(row['view'] or '-')
+        item['count'] += row['count']
+        item['total_ms'] += row['total_ms']
+        item['max_ms'] = max(item['max_ms'], row['max_ms'])
+        item['samples'].extend(row['samples'])
+    for item in merged.values():
+        p95 = percentile(sorted(item.pop('samples')), 95)
+        item['p95_ms'] = round(p95, 3) if p95 is not None else None
+        item['views'] = sorted(item['views'])
+        item['total_ms'] = round(item['total_ms'], 3)
+        item['max_ms'] = round(item['max_ms'], 3)
+    return list(merged.values())
+
+
+def prune_stale(paths):
+    """Удаляет файлы процессов, давно не сбрасывавших статистику.
+
+    Живой процесс при следующем сбросе перезапишет файл целиком,
+    поэтому удалять можно и файлы простаивающих воркеров.
+    """
+    deadline = time.time() - settings.SQLSTATS_STALE_AFTER
+    fresh = []
+    for path in paths:
+        try:
+            if os.path.getmtime(path) < deadline:
+                os.remove(path)
+            else:
+                fresh.append(path)
+        except FileNotFoundError:
+            pass
+    return fresh
+
+
+class Command(BaseCommand):
+    help = ('Самые затратные SQL-запросы по отпечаткам из статистики, '
+            'собранной SQLStatsMiddleware')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sort', choices=SORT_KEYS, default='total_ms')
+        parser.add_argument('--limit', type=int, default=20)
+        parser.add_argument('--by-view', action='store_true',
+                            help='Отдельная строка на каждое представление')
+        parser.add_argument('--json', action='store_true')
+        parser.add_argument('--reset', action='store_true',
+                            help='Удалить накопленную статистику, в том '
+                                 'числе еще не записанную процессами')
+
+    def handle(self, *args, **options):
+        paths = glob.glob(os.path.join(settings.SQLSTATS_DIR, '*.json'))
+        if options['reset']:
+            # Сначала метка: процесс, записавший файл после удаления,
+            # при следующем сбросе увидит ее и перезапишет файл пустым.
+            new_generation()
+            for path in paths:
+                os.remove(path)
+            self.stdout.write(f'Удалено файлов: {len(paths)}')
+            return
+        rows = []
+        for path in prune_stale(paths):
+            try:
+                with open(path, encoding='utf-8') as f:
+                    rows.extend(json.load(f))
+            except FileNotFoundError:
+                pass
+        top = sorted(
+            merge(rows, options['by_view']),
+            key=lambda item: item[options['sort']] or 0, reverse=True
+        )[:options['limit']]
+        if options['json']:
+            self.stdout.write(json.dumps(top, ensure_ascii=False, indent=2))
+            return
+        for item in top:
+            self.stdout.write(
+                f'{item["count"]:>8} раз  всего {item["total_ms"]:>10.1f} мс'
+                f'  p95 {item["p95_ms"]:>8.2f}  max {item["max_ms"]:>8.2f}'
+                f'  {", ".join(item["views"])}'
+            )
+            self.stdout.write(f'    {item["fingerprint"]}')
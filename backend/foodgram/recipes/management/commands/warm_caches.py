@@ -0,0 +1,132 @@
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import RequestFactory
+from django.urls import Resolver404, resolve
+from recipes.models import PopularRecipe, Tag
+from recipes.popular import WINDOWS
+from rest_framework.test import force_authenticate
+from users.models import User
+
+
+def default_targets(popular):
+    """Самые запрашиваемые адреса: справочники, первые страницы
+    списков и популярные рецепты"""
+    targets = ['/api/tags/', '/api/ingredients/', '/api/recipes/']
+    targets += [f'/api/recipes/?tags={slug}'
+                for slug in Tag.objects.values_list('slug', flat=True)]
+    targets += [f'/api/recipes/popular/?window={window}'
+                for window in WINDOWS]
+    targets += [f'/api/recipes/{recipe_id}/' for recipe_id in
+                PopularRecipe.objects.filter(
+                    window='week', recipe__deleted_at__isnull=True
+                ).order_by('rank').values_list('recipe', flat=True)[:popular]]
+    return [{'path': path} for path in targets]
+
+
+class Command(BaseCommand):
+    help = ('Прогрев кэша ответов после деплоя: адреса запрашиваются '
+            'параллельно через представления приложения')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--config',
+                            help='JSON-файл со списком {"path": адрес, '
+                                 '"user": имя пользователя (необязательно)}')
+        parser.add_argument('--popular', type=int, default=20,
+                            help='Сколько популярных рецептов прогреть')
+        parser.add_argument('--threads', type=int, default=8)
+        parser.add_argument('--host', default=settings.DOMEN,
+                            help='Хост, с которым приходят запросы')
+        parser.add_argument('--https', action='store_true')
+        parser.add_argument('--json', action='store_true')
+
+    def load_targets(self, options):
+        if not options['config']:
+            return default_targets(options['popular'])
+        try:
+            with open(options['config'], encoding='utf-8') as f:
+                targets = json.load(f)
+        except (OSError, ValueError) as error:
+            raise CommandError(f'Не удалось прочитать конфигурацию: {error}')
+        users = User.objects.in_bulk(
+            {target['user'] for target in targets if target.get('user')},
+            field_name='username'
+        )
+        for target in targets:
+            if target.get('user') and target['user'] not in users:
+                raise CommandError(
+                    f'Пользователь {target["user"]} не найден'
+                )
+            target['user'] = users.get(target.get('user'))
+        return targets
+
+    def warm(self, target):
+        path = target['path']
+        started = time.perf_counter()
+        try:
+            request = self.factory.get(path, HTTP_HOST=self.host,
+                                       secure=self.secure)
+            if target.get('user') is not None:
+                force_authenticate(request, user=target['user'])
+            match = resolve(request.path_info)
+            response = match.func(request, *match.args, **match.kwargs)
+            if hasattr(response, 'render'):
+                response.render()
+            result = {'status': response.status_code,
+                      'cache': response.get('X-Cache')}
+        except Resolver404:
+            result = {'status': 404, 'cache': None}
+        except Exception as error:
+            result = {'status': None, 'cache': None, 'error': repr(error)}
+        finally:
+            connection.close()
+        return {'path': path,
+                'user': getattr(target.get('user'), 'username', None),
+                'ms': round((time.perf_counter() - started) * 1000, 1),
+                **result}
+
+    def handle(self, *args, **options):
+        if isinstance(caches['default'], (LocMemCache, DummyCache)):
+            # Записи остались бы в памяти этой команды и пропали бы
+            # вместе с ней.
+            raise CommandError(
+                'Кэш по умолчанию не общий для процессов: задайте '
+                'CACHE_BACKEND и CACHE_LOCATION (например, Redis)'
+            )
+        targets = self.load_targets(options)
+        self.factory = RequestFactory()
+        self.host = options['host']
+        self.secure = options['https']
+        started = time.perf_counter()
+        with ThreadPoolExecutor(options['threads']) as executor:
+            results = list(executor.map(self.warm, targets))
+        report = {
+            'seconds': round(time.perf_counter() - started, 3),
+            'requests': len(results),
+            'filled': sum(result['cache'] == 'MISS' for result in results),
+            'cached': sum(result['cache'] == 'HIT' for result in results),
+            'errors': sum(result['status'] != 200 for result in results),
+            'results': results,
+        }
+        if options['json']:
+            self.stdout.write(json.dumps(report, indent=2,
+                                         ensure_ascii=False))
+            return
+        for result in results:
+            if result['status'] != 200:
+                self.stderr.write(
+                    f'{result["path"]}: {result["status"]} '
+                    f'{result.get("error", "")}'
+                )
+        self.stdout.write(
+            f'Запросов: {report["requests"]}, заполнено записей: '
+            f'{report["filled"]}, уже в кэше: {report["cached"]}, '
+            f'ошибок: {report["errors"]}, время: {report["seconds"]} с'
+        )
@@ -0,0 +1,23 @@
+# Generated by Django 4.2.11 on 2026-10-19 19:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0008_remove_link_id_alter_link_recipe'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='link',
+            name='short_link',
+            field=models.CharField(max_length=200, unique=True, verbose_name='Короткая ссылка'),
+        ),
+        migrations.AlterField(
+            model_name='recipe',
+            name='name',
+            field=models.CharField(max_length=200, verbose_name='Название'),
+        ),
+    ]
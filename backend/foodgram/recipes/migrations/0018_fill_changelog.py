@@ -0,0 +1,44 @@
+from django.db import migrations
+
+BATCH_SIZE = 1000
+
+
+def fill_changelog(apps, schema_editor):
+    """Записывает существующие объекты в журнал как созданные"""
+    ChangeLog = apps.get_model('recipes', 'ChangeLog')
+    tables = (
+        ('tag', apps.get_model('recipes', 'Tag').objects, False),
+        ('ingredient', apps.get_model('recipes', 'Ingredient').objects,
+         False),
+        ('recipe', apps.get_model('recipes', 'Recipe').objects.filter(
+            deleted_at__isnull=True
+        ), False),
+        ('favorite', apps.get_model('recipes', 'Favorite').objects, True),
+        ('shopping_cart', apps.get_model('recipes', 'ShoppingCart').objects,
+         True),
+    )
+    for table, queryset, per_user in tables:
+        if per_user:
+            rows = queryset.order_by('pk').values_list('recipe_id', 'user_id')
+        else:
+            rows = queryset.order_by('pk').values_list('pk', flat=True)
+        batch = []
+        for row in rows.iterator(chunk_size=BATCH_SIZE):
+            object_id, user_id = row if per_user else (row, None)
+            batch.append(ChangeLog(table=table, object_id=object_id,
+                                   action='create', user_id=user_id))
+            if len(batch) >= BATCH_SIZE:
+                ChangeLog.objects.bulk_create(batch)
+                batch = []
+        ChangeLog.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0017_changelog'),
+    ]
+
+    operations = [
+        migrations.RunPython(fill_changelog, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.11 on 2026-10-19 20:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0019_recipe_version'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='ingredients_snapshot',
+            field=models.JSONField(default=list, editable=False, verbose_name='Ингредиенты (копия)'),
+        ),
+    ]
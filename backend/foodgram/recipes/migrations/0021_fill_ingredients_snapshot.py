@@ -0,0 +1,45 @@
+from django.db import migrations
+
+BATCH_SIZE = 1000
+
+
+def fill_snapshots(apps, schema_editor):
+    """Заполняет копии ингредиентов существующих рецептов"""
+    Recipe = apps.get_model('recipes', 'Recipe')
+    RecipeIngredients = apps.get_model('recipes', 'RecipeIngredients')
+    recipe_ids = list(Recipe.objects.order_by('pk').values_list(
+        'pk', flat=True
+    ))
+    for start in range(0, len(recipe_ids), BATCH_SIZE):
+        snapshots = {
+            recipe_id: [] for recipe_id in recipe_ids[start:start + BATCH_SIZE]
+        }
+        rows = RecipeIngredients.objects.filter(
+            recipe__in=list(snapshots)
+        ).order_by('recipe', 'pk').values_list(
+            'recipe', 'ingredient', 'ingredient__name',
+            'ingredient__measurement_unit', 'amount'
+        )
+        for recipe_id, ingredient_id, name, unit, amount in rows:
+            snapshots[recipe_id].append({
+                'id': ingredient_id,
+                'name': name,
+                'measurement_unit': unit,
+                'amount': amount,
+            })
+        Recipe.objects.bulk_update(
+            [Recipe(pk=recipe_id, ingredients_snapshot=snapshot)
+             for recipe_id, snapshot in snapshots.items()],
+            ('ingredients_snapshot',)
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0020_recipe_ingredients_snapshot'),
+    ]
+
+    operations = [
+        migrations.RunPython(fill_snapshots, migrations.RunPython.noop),
+    ]
@@ -19,10 +19,18 @@ class ReсipeQuerySet(models.QuerySet):
         )
 
 
+class RecipeManager(models.Manager.from_queryset(ReсipeQuerySet)):
+    """Менеджер без рецептов, ожидающих удаления"""
+
+    def get_queryset(self):
+        return super().get_queryset().filter(deleted_at__isnull=True)
+
+
 class Ingredient(models.Model):
     name = models.CharField(
         'Название',
-        max_length=settings.MAX_LTH
+        max_length=settings.MAX_LTH,
+        db_index=True
     )
     measurement_unit = models.CharField(
         'Единица измерения',
@@ -65,11 +73,13 @@ class Recipe(models.Model):
     )
     name = models.CharField(
         'Название',
-        max_length=settings.MAX_LTH
+        max_length=settings.MAX_LTH,
+        db_index=True
     )
     image = models.ImageField(
         'Фотография к рецепту',
-        upload_to='recipes/'
+        upload_to='recipes/',
+        db_index=True
     )
     text = models.TextField('Описание')
     ingredients = models.ManyToManyField(
@@ -95,11 +105,45 @@ class Recipe(models.Model):
         'Дата публикации',
         auto_now_add=True
     )
+    updated = models.DateTimeField(
+        'Дата изменения',
+        auto_now=True
+    )
+    in_timelines = models.BooleanField(
+        'Разослан в ленты подписчиков',
+        default=False
+    )
+    version = models.PositiveIntegerField(
+        'Версия',
+        default=1,
+        editable=False
+    )
+    # Копия ингредиентов для чтения; источник данных — RecipeIngredients.
+    ingredients_snapshot = models.JSONField(
+        'Ингредиенты (копия)',
+        default=list,
+        editable=False
+    )
+    deleted_at = models.DateTimeField(
+        'Дата удаления',
+        null=True,
+        blank=True,
+        editable=False
+    )
 
-    objects = ReсipeQuerySet.as_manager()
+    objects = RecipeManager()
+    all_objects = ReсipeQuerySet.as_manager()
 
     class Meta:
         ordering = ('-pub_date',)
+        indexes = (
+            # Рецепты, которые лента подписок добирает при чтении.
+            models.Index(
+                fields=('author', '-pub_date'),
+                condition=models.Q(in_timelines=False),
+                name='recipe_fan_in_idx'
+            ),
+        )
         verbose_name = 'Рецепт'
         verbose_name_plural = 'Рецепты'
 
@@ -127,6 +171,12 @@ class RecipeIngredients(models.Model):
     amount = models.PositiveSmallIntegerField('Количество')
 
     class Meta:
+        indexes = (
+            models.Index(
+                fields=('ingredient', 'recipe'),
+                name='recipe_ingredient_lookup_idx'
+            ),
+        )
         verbose_name = 'Ингредиенты рецепта'
         verbose_name_plural = 'Ингредиенты рецептов'
 
@@ -207,3 +257,195 @@ class Link(models.Model):
     class Meta:
         verbose_name = 'Ссылка'
         verbose_name_plural = 'Ссылки'
+
+
+class FeedItem(models.Model):
+    """Лента подписок: рецепт автора, разосланный подписчику"""
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        verbose_name='Подписчик',
+        related_name='feed'
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        verbose_name='Автор рецепта',
+        related_name='+'
+    )
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        verbose_name='Рецепт',
+        related_name='feed_items'
+    )
+    pub_date = models.DateTimeField('Дата публикации')
+
+    class Meta:
+        constraints = (
+            models.UniqueConstraint(
+                fields=('user', 'recipe'),
+                name='unique_feed_item'
+            ),
+        )
+        indexes = (
+            models.Index(
+                fields=('user', '-pub_date', '-recipe'),
+                name='feed_item_timeline_idx'
+            ),
+            models.Index(
+                fields=('user', 'author'),
+                name='feed_item_author_idx'
+            ),
+        )
+        verbose_name = 'Запись ленты'
+        verbose_name_plural = 'Лента подписок'
+
+    def __str__(self):
+        return f'{self.recipe} в ленте {self.user}'
+
+
+class SimilarRecipe(models.Model):
+    """Предрассчитанные похожие рецепты"""
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        verbose_name='Рецепт',
+        related_name='similar'
+    )
+    similar = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        verbose_name='Похожий рецепт',
+        related_name='similar_to'
+    )
+    score = models.FloatField('Сходство')
+    computed_at = models.DateTimeField('Дата расчета', db_index=True)
+
+    class Meta:
+        constraints = (
+            models.UniqueConstraint(
+                fields=('recipe', 'similar'),
+                name='unique_similar_recipe'
+            ),
+        )
+        indexes = (
+            models.Index(
+                fields=('recipe', '-score'),
+                name='similar_recipe_score_idx'
+            ),
+        )
+        verbose_name = 'Похожий рецепт'
+        verbose_name_plural = 'Похожие рецепты'
+
+    def __str__(self):
+        return f'{self.similar} похож на {self.recipe}'
+
+
+class RecipeActivity(models.Model):
+    """Почасовой счетчик добавлений рецепта в избранное и покупки"""
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        verbose_name='Рецепт',
+        related_name='activity'
+    )
+    hour = models.DateTimeField('Час')
+    events = models.PositiveIntegerField('Добавления', default=0)
+
+    class Meta:
+        constraints = (
+            models.UniqueConstraint(
+                fields=('recipe', 'hour'),
+                name='unique_recipe_activity'
+            ),
+        )
+        indexes = (
+            models.Index(
+                fields=('hour', 'recipe'),
+                name='recipe_activity_hour_idx'
+            ),
+        )
+        verbose_name = 'Активность по рецепту'
+        verbose_name_plural = 'Активность по рецептам'
+
+    def __str__(self):
+        return f'{self.recipe} {self.hour}: {self.events}'
+
+
+class PopularRecipe(models.Model):
+    """Рейтинг популярных рецептов, рассчитанный rollup_popular_recipes"""
+    WINDOW_CHOICES = (
+        ('day', 'День'),
+        ('week', 'Неделя'),
+        ('all', 'Все время'),
+    )
+    window = models.CharField('Период', max_length=8, choices=WINDOW_CHOICES)
+    rank = models.PositiveIntegerField('Место')
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        verbose_name='Рецепт',
+        related_name='+'
+    )
+    score = models.PositiveIntegerField('Добавления')
+
+    class Meta:
+        ordering = ('window', 'rank')
+        constraints = (
+            models.UniqueConstraint(
+                fields=('window', 'rank'),
+                name='unique_popular_rank'
+            ),
+        )
+        verbose_name = 'Популярный рецепт'
+        verbose_name_plural = 'Популярные рецепты'
+
+    def __str__(self):
+        return f'{self.window} #{self.rank}: {self.recipe}'
+
+
+class ChangeLog(models.Model):
+    """Журнал изменений для инкрементальной синхронизации клиентов.
+
+    Первичный ключ служит монотонным номером изменения (seq).
+    Записи избранного и списка покупок видны только их владельцу.
+    """
+    TABLE_CHOICES = (
+        ('recipe', 'Рецепт'),
+        ('tag', 'Тег'),
+        ('ingredient', 'Ингредиент'),
+        ('favorite', 'Избранное'),
+        ('shopping_cart', 'Список покупок'),
+    )
+    ACTION_CHOICES = (
+        ('create', 'Создание'),
+        ('update', 'Изменение'),
+        ('delete', 'Удаление'),
+    )
+    table = models.CharField('Таблица', max_length=16, choices=TABLE_CHOICES)
+    object_id = models.BigIntegerField('Идентификатор объекта')
+    action = models.CharField('Действие', max_length=8,
+                              choices=ACTION_CHOICES)
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        verbose_name='Владелец',
+        related_name='+'
+    )
+    created = models.DateTimeField('Дата изменения', auto_now_add=True)
+
+    class Meta:
+        indexes = (
+            models.Index(
+                fields=('user', 'id'),
+                name='change_log_user_idx'
+            ),
+        )
+        verbose_name = 'Изменение'
+        verbose_name_plural = 'Журнал изменений'
+
+    def __str__(self):
+        return f'#{self.pk} {self.action} {self.table} {self.object_id}'
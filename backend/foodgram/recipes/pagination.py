@@ -1,6 +1,13 @@
 from rest_framework.pagination import PageNumberPagination
 
+from .paginators import EstimatedCountPaginator
+
 
 class RecipePagination(PageNumberPagination):
     page_size = 6
     page_size_query_param = 'limit'
+
+
+class UserPagination(RecipePagination):
+    """Список пользователей без COUNT(*) по всей таблице"""
+    django_paginator_class = EstimatedCountPaginator
@@ -0,0 +1,34 @@
+from django.core.paginator import Paginator
+from django.db import connections
+from django.utils.functional import cached_property
+
+# Ниже этого порога дешевле посчитать строки честно.
+ESTIMATED_COUNT_MIN = 100000
+
+
+class EstimatedCountPaginator(Paginator):
+    """Пагинатор для больших таблиц (админка, список пользователей).
+
+    Для списка без фильтров и поиска число строк берется из статистики
+    PostgreSQL (pg_class.reltuples) вместо COUNT(*) по всей таблице.
+    """
+
+    def is_unfiltered(self):
+        queryset = self.object_list
+        default = queryset.model._default_manager.all()
+        return queryset.query.where == default.query.where
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        connection = connections[queryset.db]
+        if connection.vendor == 'postgresql' and self.is_unfiltered():
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    'SELECT reltuples FROM pg_class WHERE relname = %s',
+                    [queryset.model._meta.db_table]
+                )
+                row = cursor.fetchone()
+            if row and row[0] >= ESTIMATED_COUNT_MIN:
+                return int(row[0])
+        return super().count
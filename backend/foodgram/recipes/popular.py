@@ -0,0 +1,99 @@
+from datetime import datetime, timedelta
+from datetime import timezone as dt_timezone
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.db.models import F, Sum
+from django.utils import timezone
+
+from .models import PopularRecipe, RecipeActivity
+
+WINDOWS = {
+    'day': timedelta(days=1),
+    'week': timedelta(weeks=1),
+    'all': None,
+}
+# Корзины старше самого длинного окна сворачиваются в одну на рецепт.
+ALL_TIME_HOUR = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+RETENTION = timedelta(weeks=1)
+
+
+def popular_cache_key(window):
+    return f'popular_recipes:{window}'
+
+
+def current_hour():
+    return timezone.now().replace(minute=0, second=0, microsecond=0)
+
+
+def add_events(recipe_id, hour, events):
+    """Увеличивает счетчик корзины, создавая ее при необходимости"""
+    bucket = RecipeActivity.objects.filter(recipe=recipe_id, hour=hour)
+    if bucket.update(events=F('events') + events):
+        return
+    try:
+        with transaction.atomic():
+            RecipeActivity.objects.create(recipe_id=recipe_id, hour=hour,
+                                          events=events)
+    except IntegrityError:
+        # Корзину успел создать параллельный запрос.
+        bucket.update(events=F('events') + events)
+
+
+def record_activity(recipe_id):
+    """Учитывает добавление рецепта в избранное или покупки"""
+    add_events(recipe_id, current_hour(), 1)
+
+
+@transaction.atomic
+def compact_activity(now_hour):
+    """Сворачивает корзины, вышедшие за самое длинное окно"""
+    expired = RecipeActivity.objects.filter(
+        hour__gt=ALL_TIME_HOUR, hour__lte=now_hour - RETENTION
+    )
+    totals = expired.values('recipe').annotate(
+        total=Sum('events')
+    ).order_by().values_list('recipe', 'total')
+    for recipe_id, total in totals:
+        add_events(recipe_id, ALL_TIME_HOUR, total)
+    expired.delete()
+
+
+def rollup(size=None):
+    """Пересчитывает рейтинги всех окон и обновляет кэш"""
+    size = size or settings.POPULAR_RECIPES_SIZE
+    now_hour = current_hour()
+    compact_activity(now_hour)
+    for window, period in WINDOWS.items():
+        activity = RecipeActivity.objects.filter(
+            recipe__deleted_at__isnull=True
+        )
+        if period is not None:
+            activity = activity.filter(hour__gt=now_hour - period)
+        ranked = activity.values('recipe').annotate(
+            score=Sum('events')
+        ).order_by('-score', 'recipe').values_list('recipe', 'score')[:size]
+        rows = [
+            PopularRecipe(window=window, rank=rank, recipe_id=recipe_id,
+                          score=score)
+            for rank, (recipe_id, score) in enumerate(ranked, 1)
+        ]
+        with transaction.atomic():
+            PopularRecipe.objects.filter(window=window).delete()
+            PopularRecipe.objects.bulk_create(rows)
+        cache.set(popular_cache_key(window),
+                  [row.recipe_id for row in rows],
+                  settings.POPULAR_RECIPES_CACHE_TTL)
+
+
+def get_popular_ids(window):
+    """Идентификаторы рецептов рейтинга, в первую очередь из кэша"""
+    key = popular_cache_key(window)
+    recipe_ids = cache.get(key)
+    if recipe_ids is None:
+        recipe_ids = list(PopularRecipe.objects.filter(
+            window=window
+        ).values_list('recipe', flat=True))
+        cache.set(key, recipe_ids, settings.POPULAR_RECIPES_CACHE_TTL)
+    return recipe_ids
@@ -0,0 +1,50 @@
+import hashlib
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework import status
+
+
+def table_version_key(table):
+    return f'table_version:{table}'
+
+
+def get_table_version(table):
+    """Версия справочника (теги, ингредиенты) для ключей кэша ответов"""
+    key = table_version_key(table)
+    cache.add(key, uuid.uuid4().hex, None)
+    return cache.get(key) or 'unknown'
+
+
+def bump_table_version(table):
+    cache.delete(table_version_key(table))
+
+
+def response_cache_key(request, version):
+    """Ключ ответа: адрес с параметрами, схема, хост и версия данных"""
+    value = '|'.join((request.scheme, request.get_host(),
+                      request.get_full_path(), str(version)))
+    return 'response:' + hashlib.md5(value.encode()).hexdigest()
+
+
+def cached_response(key, handler, *args, **kwargs):
+    """Данные ответа из кэша или результат handler, сохраненный в кэш.
+
+    Версия в ключе меняется вместе с данными, поэтому записи
+    не удаляются, а устаревают по RESPONSE_CACHE_TTL.
+    """
+    # Модуль импортируется сигналами при django.setup(), а ответы DRF
+    # тянут за собой compat с requests и yaml: откладываем до запроса.
+    from rest_framework.response import Response
+
+    data = cache.get(key)
+    if data is not None:
+        response = Response(data)
+        response['X-Cache'] = 'HIT'
+        return response
+    response = handler(*args, **kwargs)
+    if response.status_code == status.HTTP_200_OK:
+        cache.set(key, response.data, settings.RESPONSE_CACHE_TTL)
+        response['X-Cache'] = 'MISS'
+    return response
@@ -4,8 +4,10 @@ from rest_framework import serializers, status
 from rest_framework.exceptions import ValidationError
 from users.serializers import UserSerializer
 
+from .etags import bump_recipe_versions
 from .models import (Favorite, Ingredient, Link, Recipe, RecipeIngredients,
                      Tag)
+from .snapshots import snapshot_item
 
 
 class IngredientSerializer(serializers.ModelSerializer):
@@ -25,22 +27,6 @@ class TagSerializer(serializers.ModelSerializer):
         fields = ('id', 'name', 'slug')
 
 
-class RecipeIngredientsSerializer(serializers.ModelSerializer):
-    """Сериализатор для промежуточной модели рецепты-ингредиенты"""
-    id = serializers.ReadOnlyField(
-        source='ingredient.id')
-    name = serializers.ReadOnlyField(
-        source='ingredient.name'
-    )
-    measurement_unit = serializers.ReadOnlyField(
-        source='ingredient.measurement_unit'
-    )
-
-    class Meta:
-        model = RecipeIngredients
-        fields = ('id', 'name', 'measurement_unit', 'amount')
-
-
 class IngredientAddSerializer(serializers.ModelSerializer):
     """Сериализатор для добавления ингредиентов в рецепт"""
     id = serializers.PrimaryKeyRelatedField(queryset=Ingredient.objects.all())
@@ -55,10 +41,8 @@ class RecipeSerializer(serializers.ModelSerializer):
     """Сериализатор для просмотра рецепта"""
     tags = TagSerializer(many=True,
                          read_only=True)
-    ingredients = RecipeIngredientsSerializer(
-        many=True,
-        source='ingredient_in_recipe',
-        read_only=True)
+    ingredients = serializers.JSONField(source='ingredients_snapshot',
+                                        read_only=True)
     author = UserSerializer(read_only=True)
     is_favorited = serializers.BooleanField(default=False, read_only=True)
     is_in_shopping_cart = serializers.BooleanField(
@@ -156,6 +140,13 @@ class RecipeCUDSerializer(serializers.ModelSerializer):
             recipe_ingredients.append(recipe_ingredient)
         with transaction.atomic():
             RecipeIngredients.objects.bulk_create(recipe_ingredients)
+            model.ingredients_snapshot = [
+                snapshot_item(ingredient['id'], ingredient['amount'])
+                for ingredient in ingredients
+            ]
+            Recipe.all_objects.filter(pk=model.pk).update(
+                ingredients_snapshot=model.ingredients_snapshot
+            )
         model.tags.set(tags)
 
     @transaction.atomic
@@ -177,7 +168,13 @@ class RecipeCUDSerializer(serializers.ModelSerializer):
         tags = validated_data.pop('tags')
         instance.ingredients.clear()
         self.add_tags_ingredients(ingredients, tags, instance)
-        return super().update(instance, validated_data)
+        for field, value in validated_data.items():
+            setattr(instance, field, value)
+        # Только поля из запроса: deleted_at, version и in_timelines
+        # могли измениться, пока шло редактирование.
+        instance.save(update_fields=[*validated_data, 'updated'])
+        bump_recipe_versions([instance.pk])
+        return instance
 
 
 class FavoriteSerializer(serializers.ModelSerializer):
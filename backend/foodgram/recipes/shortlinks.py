@@ -0,0 +1,93 @@
+import re
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseRedirect
+
+from .models import Link
+
+# short_link_url выдает ссылки без завершающего слеша.
+SHORT_LINK_PATH = re.compile(r'^/s/([^/]+)/?$')
+
+
+def short_link_url(code):
+    return f'http://{settings.DOMEN}/s/{code}'
+
+
+def frontend_url(original_url):
+    """Адрес рецепта во фронтенде по адресу в API"""
+    return original_url.replace('/api', '', 1).rstrip('/')
+
+
+class LinkCache:
+    """LRU-кэш процесса: код короткой ссылки -> адрес перехода"""
+
+    def __init__(self, size, ttl):
+        self.size = size
+        self.ttl = ttl
+        self.items = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, code):
+        with self.lock:
+            item = self.items.get(code)
+            if item is None:
+                return None
+            target, expires = item
+            if expires < time.monotonic():
+                del self.items[code]
+                return None
+            self.items.move_to_end(code)
+            return target
+
+    def set(self, code, target):
+        with self.lock:
+            self.items[code] = (target, time.monotonic() + self.ttl)
+            self.items.move_to_end(code)
+            while len(self.items) > self.size:
+                self.items.popitem(last=False)
+
+
+link_cache = LinkCache(settings.SHORT_LINK_CACHE_SIZE,
+                       settings.SHORT_LINK_CACHE_TTL)
+
+
+def resolve_short_link(code):
+    """Адрес перехода по коду или None, если ссылки нет"""
+    target = link_cache.get(code)
+    if target is None:
+        original_url = Link.objects.filter(
+            short_link=short_link_url(code),
+            recipe__deleted_at__isnull=True
+        ).values_list('original_url', flat=True).first()
+        if original_url is None:
+            return None
+        target = frontend_url(original_url)
+        link_cache.set(code, target)
+    return target
+
+
+def redirect_response(code):
+    target = resolve_short_link(code)
+    if target is None:
+        return HttpResponse('Link not found', status=404)
+    return HttpResponseRedirect(target)
+
+
+class ShortLinkMiddleware:
+    """Переход по короткой ссылке до остальных middleware.
+
+    Сессии, CSRF и аутентификация для перехода не нужны, поэтому
+    middleware стоит первым в MIDDLEWARE и отвечает сам.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        match = SHORT_LINK_PATH.match(request.path_info)
+        if match is None or request.method not in ('GET', 'HEAD'):
+            return self.get_response(request)
+        return redirect_response(match.group(1))
@@ -0,0 +1,140 @@
+from django.core.cache import cache
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+from users.models import Subscription, User
+
+from .changelog import CREATE, DELETE, UPDATE, log_change
+from .etags import bump_recipe_versions, bump_viewer_state
+from .feed import backfill_subscription, remove_subscription
+from .models import (Favorite, Ingredient, Recipe, RecipeIngredients,
+                     ShoppingCart, Tag)
+from .popular import record_activity
+from .responses import bump_table_version
+from .snapshots import refresh_snapshots
+from .tasks import fan_out
+from .utils import TAG_SLUGS_CACHE_KEY
+
+
+@receiver(post_save, sender=Recipe)
+def recipe_created(sender, instance, created, **kwargs):
+    if created:
+        # Задача создается в той же транзакции, что и рецепт.
+        fan_out.delay(instance.pk)
+
+
+@receiver(post_save, sender=Subscription)
+def subscription_created(sender, instance, created, **kwargs):
+    if created:
+        backfill_subscription(instance.user_id, instance.author_id)
+
+
+@receiver(post_delete, sender=Subscription)
+def subscription_deleted(sender, instance, **kwargs):
+    remove_subscription(instance.user_id, instance.author_id)
+
+
+@receiver((post_save, post_delete), sender=Tag)
+def tag_changed(sender, **kwargs):
+    cache.delete(TAG_SLUGS_CACHE_KEY)
+    bump_table_version('tag')
+
+
+@receiver((post_save, post_delete), sender=Ingredient)
+def ingredient_changed(sender, **kwargs):
+    bump_table_version('ingredient')
+
+
+@receiver(post_save, sender=Favorite)
+@receiver(post_save, sender=ShoppingCart)
+def recipe_added(sender, instance, created, **kwargs):
+    if created:
+        record_activity(instance.recipe_id)
+
+
+def ingredient_recipe_ids(ingredient):
+    return list(RecipeIngredients.objects.filter(
+        ingredient=ingredient
+    ).values_list('recipe', flat=True).distinct())
+
+
+CHANGELOG_TABLES = {
+    Recipe: 'recipe',
+    Tag: 'tag',
+    Ingredient: 'ingredient',
+    Favorite: 'favorite',
+    ShoppingCart: 'shopping_cart',
+}
+
+
+@receiver(post_save, sender=Recipe)
+@receiver(post_save, sender=Tag)
+@receiver(post_save, sender=Ingredient)
+def log_saved(sender, instance, created, **kwargs):
+    log_change(CHANGELOG_TABLES[sender], instance.pk,
+               CREATE if created else UPDATE)
+
+
+@receiver(post_delete, sender=Recipe)
+@receiver(post_delete, sender=Tag)
+@receiver(post_delete, sender=Ingredient)
+def log_deleted(sender, instance, **kwargs):
+    # Удаление помеченного рецепта записано в журнал при пометке.
+    if getattr(instance, 'deleted_at', None) is None:
+        log_change(CHANGELOG_TABLES[sender], instance.pk, DELETE)
+
+
+@receiver(post_save, sender=Favorite)
+@receiver(post_save, sender=ShoppingCart)
+def log_user_saved(sender, instance, created, **kwargs):
+    if created:
+        log_change(CHANGELOG_TABLES[sender], instance.recipe_id, CREATE,
+                   instance.user_id)
+
+
+@receiver(post_delete, sender=Favorite)
+@receiver(post_delete, sender=ShoppingCart)
+def log_user_deleted(sender, instance, **kwargs):
+    log_change(CHANGELOG_TABLES[sender], instance.recipe_id, DELETE,
+               instance.user_id)
+
+
+@receiver(post_save, sender=Tag)
+@receiver(pre_delete, sender=Tag)
+def tag_recipes_changed(sender, instance, **kwargs):
+    bump_recipe_versions(Recipe.all_objects.filter(tags=instance))
+
+
+@receiver(post_save, sender=Ingredient)
+def ingredient_saved(sender, instance, created, **kwargs):
+    if created:
+        return
+    recipe_ids = ingredient_recipe_ids(instance)
+    refresh_snapshots(recipe_ids)
+    bump_recipe_versions(recipe_ids)
+
+
+@receiver(pre_delete, sender=Ingredient)
+def ingredient_deleting(sender, instance, **kwargs):
+    # Строки RecipeIngredients удалятся каскадом, рецепты запоминаем заранее.
+    instance._recipe_ids = ingredient_recipe_ids(instance)
+
+
+@receiver(post_delete, sender=Ingredient)
+def ingredient_deleted(sender, instance, **kwargs):
+    refresh_snapshots(instance._recipe_ids)
+    bump_recipe_versions(instance._recipe_ids)
+
+
+@receiver(post_save, sender=User)
+def author_recipes_changed(sender, instance, update_fields=None, **kwargs):
+    # Вход пользователя обновляет только last_login.
+    if update_fields and set(update_fields) <= {'last_login'}:
+        return
+    bump_recipe_versions(Recipe.all_objects.filter(author=instance))
+
+
+@receiver((post_save, post_delete), sender=Favorite)
+@receiver((post_save, post_delete), sender=ShoppingCart)
+@receiver((post_save, post_delete), sender=Subscription)
+def viewer_state_changed(sender, instance, **kwargs):
+    bump_viewer_state(instance.user_id)
@@ -0,0 +1,42 @@
+from .models import Recipe, RecipeIngredients
+
+
+def snapshot_item(ingredient, amount):
+    """Элемент копии ингредиентов в формате ответа API"""
+    return {
+        'id': ingredient.pk,
+        'name': ingredient.name,
+        'measurement_unit': ingredient.measurement_unit,
+        'amount': amount,
+    }
+
+
+def build_snapshots(recipe_ids):
+    """Копии ингредиентов рецептов, собранные из RecipeIngredients"""
+    snapshots = {recipe_id: [] for recipe_id in recipe_ids}
+    rows = RecipeIngredients.objects.filter(
+        recipe__in=recipe_ids
+    ).order_by('recipe', 'pk').values_list(
+        'recipe', 'ingredient', 'ingredient__name',
+        'ingredient__measurement_unit', 'amount'
+    )
+    for recipe_id, ingredient_id, name, unit, amount in rows:
+        snapshots[recipe_id].append({
+            'id': ingredient_id,
+            'name': name,
+            'measurement_unit': unit,
+            'amount': amount,
+        })
+    return snapshots
+
+
+def refresh_snapshots(recipe_ids, batch_size=1000):
+    """Пересобирает копии ингредиентов пачками по batch_size рецептов"""
+    recipe_ids = list(recipe_ids)
+    for start in range(0, len(recipe_ids), batch_size):
+        snapshots = build_snapshots(recipe_ids[start:start + batch_size])
+        Recipe.all_objects.bulk_update(
+            [Recipe(pk=recipe_id, ingredients_snapshot=snapshot)
+             for recipe_id, snapshot in snapshots.items()],
+            ('ingredients_snapshot',)
+        )
@@ -0,0 +1,26 @@
+from taskqueue.registry import task
+
+from .deletion import purge_deleted
+from .feed import fan_out_recipe
+from .models import Recipe
+from .popular import rollup
+
+
+@task
+def fan_out(recipe_id):
+    """Рассылка нового рецепта по лентам подписчиков"""
+    recipe = Recipe.objects.filter(pk=recipe_id).first()
+    if recipe is not None:
+        fan_out_recipe(recipe)
+
+
+@task
+def purge(chunk_size=500):
+    """Отложенное удаление рецептов и пользователей"""
+    purge_deleted(chunk_size)
+
+
+@task
+def rollup_popular():
+    """Пересчет рейтинга популярных рецептов"""
+    rollup()
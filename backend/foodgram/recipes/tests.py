@@ -0,0 +1,314 @@
+import os
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.test import (SimpleTestCase, TestCase, TransactionTestCase,
+                         override_settings)
+from django.utils import timezone
+from rest_framework.test import APIClient
+from users.models import User
+
+from .changelog import CREATE, get_changes, log_change
+from .etags import bump_recipe_versions
+from .filters import RecipeFilter
+from .management.commands.profile_startup import parse_importtime
+from .models import Ingredient, Link, Recipe, Tag
+from .serializers import RecipeCUDSerializer
+from .shortlinks import link_cache, short_link_url
+from .throttling import RecipeLinkThrottle
+
+
+class RecipeTagsFilterTests(TestCase):
+    """Фильтр по нескольким тегам без дублей и с верным count"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(
+            username='author', email='author@example.org', password='pass'
+        )
+        cls.breakfast = Tag.objects.create(name='Завтрак', slug='breakfast')
+        cls.lunch = Tag.objects.create(name='Обед', slug='lunch')
+        cls.dinner = Tag.objects.create(name='Ужин', slug='dinner')
+        tags = ((cls.breakfast, cls.lunch), (cls.breakfast,), (cls.lunch,),
+                (cls.breakfast, cls.lunch, cls.dinner), (cls.dinner,))
+        for number, recipe_tags in enumerate(tags):
+            recipe = Recipe.objects.create(
+                author=cls.author, name=f'Рецепт {number}',
+                image='recipes/test.png', text='Текст', cooking_time=10
+            )
+            recipe.tags.set(recipe_tags)
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+
+    def get_list(self):
+        response = self.client.get(
+            '/api/recipes/', {'tags': ['breakfast', 'lunch'], 'limit': 100}
+        )
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_recipe_with_several_tags_listed_once(self):
+        ids = [recipe['id'] for recipe in self.get_list()['results']]
+        self.assertEqual(len(ids), len(set(ids)))
+        expected = set(Recipe.objects.filter(
+            tags__in=(self.breakfast, self.lunch)
+        ).values_list('pk', flat=True))
+        self.assertEqual(set(ids), expected)
+
+    def test_count_matches_distinct_queryset(self):
+        distinct = Recipe.objects.filter(
+            tags__in=(self.breakfast, self.lunch)
+        ).distinct()
+        self.assertEqual(self.get_list()['count'], len(distinct))
+        filtered = RecipeFilter(
+            data={'tags': ['breakfast', 'lunch']},
+            queryset=Recipe.objects.all()
+        ).qs
+        self.assertEqual(filtered.count(), len(distinct))
+
+    def test_tag_deleted_after_validation(self):
+        filterset = RecipeFilter(data={'tags': ['breakfast', 'dinner']},
+                                 queryset=Recipe.objects.all())
+        self.assertTrue(filterset.is_valid())
+        Tag.objects.filter(slug='dinner').delete()
+        cache.clear()
+        filtered = filterset.tags_filter(Recipe.objects.all(), 'tags',
+                                         ['breakfast', 'dinner'])
+        self.assertEqual(
+            set(filtered.values_list('pk', flat=True)),
+            set(self.breakfast.recipes.values_list('pk', flat=True))
+        )
+
+
+class StartupImportTests(SimpleTestCase):
+    """Холодный импорт WSGI-модуля, с которого стартует воркер gunicorn"""
+    # Тот же бюджет, что у profile_startup в CI.
+    MAX_IMPORT_MS = 1500
+    # Нужны только первому запросу: представления, сериализаторы DRF
+    # и обработка изображений.
+    DEFERRED = ('recipes.views', 'users.views', 'rest_framework.serializers',
+                'drf_extra_fields', 'PIL')
+
+    def test_wsgi_cold_import(self):
+        script = ('import sys, foodgram.wsgi; '
+                  f'print([m for m in {self.DEFERRED!r} if m in sys.modules])')
+        result = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', script],
+            capture_output=True, text=True, env=os.environ.copy(),
+            cwd=settings.BASE_DIR
+        )
+        self.assertEqual(result.returncode, 0, result.stderr[-2000:])
+        self.assertEqual(result.stdout.strip(), '[]')
+        total, packages, modules = parse_importtime(
+            result.stderr.splitlines()
+        )
+        self.assertLess(total, self.MAX_IMPORT_MS)
+
+
+class SlowCache:
+    """Кэш с задержкой сети, как у общего Redis"""
+
+    def __init__(self, cache, delay):
+        self.cache = cache
+        self.delay = delay
+
+    def __getattr__(self, name):
+        method = getattr(self.cache, name)
+
+        def call(*args, **kwargs):
+            time.sleep(self.delay)
+            return method(*args, **kwargs)
+        return call
+
+
+@override_settings(REST_FRAMEWORK={
+    **settings.REST_FRAMEWORK,
+    'DEFAULT_THROTTLE_RATES': {'recipe_link_ip': '5/min'},
+})
+class ThrottleTests(TransactionTestCase):
+    """Параллельные запросы не обходят лимит"""
+    REQUESTS = 20
+
+    def setUp(self):
+        cache.clear()
+
+    def get_link(self, number):
+        try:
+            # Рецепта нет: пропущенный запрос получает 404, а 429
+            # отдается до обращения к БД.
+            return APIClient().get('/api/recipes/0/get-link/',
+                                   HTTP_X_REAL_IP='10.0.0.1')
+        finally:
+            connection.close()
+
+    @mock.patch.object(RecipeLinkThrottle, 'cache', SlowCache(cache, 0.005))
+    def test_parallel_requests_throttled(self):
+        with ThreadPoolExecutor(self.REQUESTS) as executor:
+            responses = list(executor.map(self.get_link,
+                                          range(self.REQUESTS)))
+        statuses = [response.status_code for response in responses]
+        self.assertEqual(statuses.count(404), 5)
+        self.assertEqual(statuses.count(429), self.REQUESTS - 5)
+        for response in responses:
+            if response.status_code == 429:
+                self.assertGreater(int(response['Retry-After']), 0)
+
+
+class SyncTests(TestCase):
+    """Журнал изменений и курсор since"""
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def test_changes_after_since(self):
+        first = Tag.objects.create(name='Завтрак', slug='breakfast')
+        response = self.client.get('/api/sync/')
+        self.assertEqual(response.status_code, 200)
+        since = response.data['since']
+        second = Tag.objects.create(name='Обед', slug='lunch')
+        first.name = 'Ранний завтрак'
+        first.save()
+        response = self.client.get('/api/sync/', {'since': since})
+        self.assertEqual(
+            [(change['table'], change['id'], change['action'])
+             for change in response.data['changes']],
+            [('tag', second.pk, 'create'), ('tag', first.pk, 'update')]
+        )
+
+
+class LateCommitSyncTests(TransactionTestCase):
+    """Запись, закоммиченная позже записи с большим номером"""
+
+    def log_in_thread(self, object_id, started=None, release=None):
+        def run():
+            try:
+                with transaction.atomic():
+                    log_change('tag', object_id, CREATE)
+                    if started is not None:
+                        started.set()
+                        release.wait(5)
+            finally:
+                connection.close()
+        thread = threading.Thread(target=run)
+        thread.start()
+        return thread
+
+    def test_late_commit_is_not_skipped(self):
+        if connection.vendor == 'sqlite' and connection.is_in_memory_db():
+            self.skipTest('SQLite в памяти не ждет блокировку записи')
+        started, release = threading.Event(), threading.Event()
+        slow = self.log_in_thread(1, started, release)
+        started.wait(5)
+        fast = self.log_in_thread(2)
+        # Вторая запись ждет коммита первой и не видна раньше нее.
+        fast.join(0.5)
+        entries, since, has_more = get_changes(AnonymousUser(), 0, 100)
+        self.assertEqual(entries, [])
+        release.set()
+        slow.join()
+        fast.join()
+        entries, since, has_more = get_changes(AnonymousUser(), since, 100)
+        self.assertEqual([entry.object_id for entry in entries], [1, 2])
+
+
+class ShortLinkTests(TestCase):
+    """Переход по короткой ссылке в виде, в котором ее выдали"""
+
+    @classmethod
+    def setUpTestData(cls):
+        author = User.objects.create_user(
+            username='author', email='author@example.org', password='pass'
+        )
+        cls.recipe = Recipe.objects.create(
+            author=author, name='Рецепт', image='recipes/test.png',
+            text='Текст', cooking_time=10
+        )
+        Link.objects.create(recipe=cls.recipe,
+                            short_link=short_link_url('ABCD'),
+                            original_url=cls.recipe.get_absolute_url())
+
+    def setUp(self):
+        link_cache.items.clear()
+
+    def test_with_and_without_slash(self):
+        for path in ('/s/ABCD', '/s/ABCD/'):
+            response = self.client.get(path)
+            self.assertEqual(response.status_code, 302, path)
+            self.assertEqual(response['Location'],
+                             f'/recipes/{self.recipe.pk}')
+
+
+class RecipeUpdateTests(TestCase):
+    """Редактирование не затирает поля, измененные параллельно"""
+
+    def test_update_keeps_concurrent_changes(self):
+        author = User.objects.create_user(
+            username='author', email='author@example.org', password='pass'
+        )
+        tag = Tag.objects.create(name='Завтрак', slug='breakfast')
+        ingredient = Ingredient.objects.create(name='Соль',
+                                               measurement_unit='г')
+        recipe = Recipe.objects.create(
+            author=author, name='Рецепт', image='recipes/test.png',
+            text='Текст', cooking_time=10
+        )
+        stale = Recipe.objects.get(pk=recipe.pk)
+        deleted_at = timezone.now()
+        Recipe.all_objects.filter(pk=recipe.pk).update(
+            deleted_at=deleted_at, in_timelines=True
+        )
+        serializer = RecipeCUDSerializer(stale, partial=True, data={
+            'name': 'Новое название', 'tags': [tag.pk],
+            'ingredients': [{'id': ingredient.pk, 'amount': 2}],
+        })
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+        serializer.save()
+        recipe = Recipe.all_objects.get(pk=recipe.pk)
+        self.assertEqual(recipe.name, 'Новое название')
+        self.assertEqual(recipe.deleted_at, deleted_at)
+        self.assertTrue(recipe.in_timelines)
+        self.assertEqual(recipe.version, 2)
+
+
+class RecipeListETagTests(TestCase):
+    """ETag списка считается по строкам страницы"""
+
+    @classmethod
+    def setUpTestData(cls):
+        author = User.objects.create_user(
+            username='author', email='author@example.org', password='pass'
+        )
+        for number in range(4):
+            Recipe.objects.create(
+                author=author, name=f'Рецепт {number}',
+                image='recipes/test.png', text='Текст', cooking_time=10
+            )
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+
+    def test_not_modified_and_page_changes(self):
+        response = self.client.get('/api/recipes/', {'limit': 2})
+        etag = response['ETag']
+        first = response.data['results'][0]['id']
+        # COUNT и id с версиями рецептов страницы, без агрегатов.
+        with self.assertNumQueries(2):
+            response = self.client.get('/api/recipes/', {'limit': 2},
+                                       HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        bump_recipe_versions([first])
+        response = self.client.get('/api/recipes/', {'limit': 2},
+                                   HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
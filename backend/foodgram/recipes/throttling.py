@@ -0,0 +1,101 @@
+import time
+
+from django.core.cache import cache
+from rest_framework.settings import api_settings
+from rest_framework.throttling import BaseThrottle, SimpleRateThrottle
+
+
+class SlidingWindowThrottle(BaseThrottle):
+    """Скользящее окно на счетчиках в общем кэше.
+
+    Для каждого запроса учитывается счетчик пользователя (если он
+    авторизован) и счетчик IP-адреса. Лимиты берутся из
+    DEFAULT_THROTTLE_RATES по ключам `<scope>_user` и `<scope>_ip`.
+    Счетчик текущего окна меняется только через cache.incr/decr,
+    которые атомарны в Redis и memcached, поэтому параллельные
+    запросы не могут потратить один и тот же лимит дважды.
+    """
+    scope = None
+    methods = None
+    cache = cache
+    timer = time.time
+
+    def get_rate(self, kind):
+        return api_settings.DEFAULT_THROTTLE_RATES.get(f'{self.scope}_{kind}')
+
+    def get_ident(self, request):
+        # X-Real-IP выставляет nginx, напрямую бэкенд наружу не смотрит.
+        return (request.META.get('HTTP_X_REAL_IP')
+                or request.META.get('REMOTE_ADDR'))
+
+    def get_idents(self, request):
+        if request.user and request.user.is_authenticated:
+            yield 'user', request.user.pk
+        yield 'ip', self.get_ident(request)
+
+    def hit(self, key, timeout):
+        """Увеличивает счетчик окна и возвращает новое значение"""
+        self.cache.add(key, 0, timeout)
+        try:
+            return self.cache.incr(key)
+        except ValueError:
+            # Ключ истек между add и incr.
+            self.cache.add(key, 0, timeout)
+            return self.cache.incr(key)
+
+    def consume(self, key, capacity, duration):
+        """Учитывает запрос, возвращает время ожидания в секундах.
+
+        Число запросов за последние duration секунд оценивается как
+        счетчик текущего окна плюс доля предыдущего, которая еще
+        попадает в интервал.
+        """
+        now = self.timer()
+        window, elapsed = divmod(now, duration)
+        current = f'{key}:{int(window)}'
+        count = self.hit(current, duration * 2)
+        previous = self.cache.get(f'{key}:{int(window) - 1}', 0)
+        weight = 1 - elapsed / duration
+        if previous * weight + count <= capacity:
+            return 0
+        # Отклоненный запрос лимит не расходует.
+        self.cache.decr(current)
+        free = capacity - count
+        if previous and free >= 0:
+            # Ждем, пока доля предыдущего окна не освободит место.
+            return max(weight - free / previous, 0) * duration
+        return duration - elapsed
+
+    def allow_request(self, request, view):
+        self.wait_time = 0
+        if self.methods and request.method not in self.methods:
+            return True
+        for kind, ident in self.get_idents(request):
+            rate = self.get_rate(kind)
+            if rate is None:
+                continue
+            capacity, duration = SimpleRateThrottle.parse_rate(None, rate)
+            self.wait_time = max(self.wait_time, self.consume(
+                f'throttle:{self.scope}:{kind}:{ident}', capacity, duration
+            ))
+        return not self.wait_time
+
+    def wait(self):
+        return self.wait_time
+
+
+class ShoppingCartThrottle(SlidingWindowThrottle):
+    scope = 'shopping_cart'
+
+
+class RecipeLinkThrottle(SlidingWindowThrottle):
+    scope = 'recipe_link'
+
+
+class RecipeWriteThrottle(SlidingWindowThrottle):
+    scope = 'recipe_write'
+
+
+class AvatarThrottle(SlidingWindowThrottle):
+    scope = 'avatar'
+    methods = ('PUT',)
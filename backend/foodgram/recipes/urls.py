@@ -3,7 +3,7 @@ from django.urls import path
 from rest_framework.routers import DefaultRouter
 
 from recipes.views import (GetRecipeLink, IngredientViewSet, RecipeViewSet,
-                           TagViewSet)
+                           SyncView, TagViewSet)
 
 router = DefaultRouter()
 router.register('ingredients', IngredientViewSet, 'ingredient')
@@ -12,5 +12,6 @@ router.register('recipes', RecipeViewSet, 'recipe')
 
 urlpatterns = [
     path('recipes/<int:recipe_id>/get-link/', GetRecipeLink.as_view()),
+    path('sync/', SyncView.as_view()),
     path('', include(router.urls)),
 ]
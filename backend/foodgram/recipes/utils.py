@@ -1,6 +1,11 @@
 from django.conf import settings
+from django.core.cache import cache
 from django.http import FileResponse
 
+from .models import Tag
+
+TAG_SLUGS_CACHE_KEY = 'tag_slugs'
+
 
 def shopping_txt(shop_list):
     file_name = settings.SHOPPING_CART
@@ -19,3 +24,20 @@ def shopping_txt(shop_list):
                             as_attachment=True,
                             filename=file_name)
     return response
+
+
+def percentile(values, rank):
+    """Перцентиль по методу ближайшего ранга для отсортированного списка"""
+    if not values:
+        return None
+    index = max(0, int(round(rank / 100 * len(values))) - 1)
+    return values[min(index, len(values) - 1)]
+
+
+def get_tag_slug_map():
+    """Словарь slug -> id тегов из кэша"""
+    slugs = cache.get(TAG_SLUGS_CACHE_KEY)
+    if slugs is None:
+        slugs = dict(Tag.objects.values_list('slug', 'pk'))
+        cache.set(TAG_SLUGS_CACHE_KEY, slugs, settings.TAG_SLUGS_CACHE_TTL)
+    return slugs
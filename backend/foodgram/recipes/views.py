@@ -2,27 +2,51 @@ import random
 import string
 
 from django.conf import settings
-from django.db.models import Sum
-from django.http import Http404, HttpResponse
-from django.shortcuts import get_object_or_404, redirect
+from django.db.models import Prefetch, Sum
+from django.http import Http404
+from django.shortcuts import get_object_or_404
+from django.utils.cache import patch_vary_headers
+from django.utils.http import parse_etags
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import status, viewsets
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.permissions import SAFE_METHODS, AllowAny, IsAuthenticated
 from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
 from rest_framework.views import APIView
+from users.models import User
 
+from .changelog import DELETE, get_changes
+from .deletion import mark_recipe_deleted
+from .etags import recipe_etag, recipe_list_etag
+from .facets import facet_counts, parse_facets
+from .feed import get_feed_page
 from .filters import IngredientFilter, RecipeFilter
+from .idempotency import idempotent
 from .models import (Favorite, Ingredient, Link, Recipe, RecipeIngredients,
                      ShoppingCart, Tag)
 from .pagination import RecipePagination
 from .permissions import IsAuthorOrReadOnly
+from .popular import WINDOWS, get_popular_ids
+from .responses import (cached_response, get_table_version,
+                        response_cache_key)
 from .serializers import (IngredientSerializer, LinkSerializer,
                           RecipeCUDSerializer, RecipeSerializer,
                           ShortRecipeSerializer, TagSerializer)
+from .shortlinks import redirect_response, short_link_url
+from .throttling import (RecipeLinkThrottle, RecipeWriteThrottle,
+                         ShoppingCartThrottle)
 from .utils import shopping_txt
 
 
+def author_prefetch(user):
+    """Авторы рецептов с признаком подписки одним запросом"""
+    return Prefetch(
+        'author', queryset=User.all_objects.annotate_for_viewer(user)
+    )
+
+
 class IngredientViewSet(viewsets.ReadOnlyModelViewSet):
     """Получение списка ингредиентов или отдельного ингредиента"""
     queryset = Ingredient.objects.all()
@@ -32,6 +56,12 @@ class IngredientViewSet(viewsets.ReadOnlyModelViewSet):
     permission_classes = (AllowAny, )
     pagination_class = None
 
+    def list(self, request, *args, **kwargs):
+        return cached_response(
+            response_cache_key(request, get_table_version('ingredient')),
+            super().list, request, *args, **kwargs
+        )
+
 
 class RecipeViewSet(viewsets.ModelViewSet):
     """Работа с рецептами"""
@@ -46,18 +76,90 @@ class RecipeViewSet(viewsets.ModelViewSet):
             return RecipeSerializer
         return RecipeCUDSerializer
 
+    def get_throttles(self):
+        if self.action in ('create', 'update', 'partial_update'):
+            return [RecipeWriteThrottle()]
+        return super().get_throttles()
+
     def get_queryset(self):
         user = self.request.user
         queryset = Recipe.objects.all().prefetch_related(
-            'author', 'ingredients')
-        if self.action in ['list', 'retrieve'] and user.is_authenticated:
+            'tags', author_prefetch(user)
+        )
+        if (self.action in ('list', 'retrieve', 'feed', 'similar',
+                            'popular')
+                and user.is_authenticated):
             queryset = queryset.annotate_for_shopping_favourite(user)
         return queryset
 
+    def conditional_response(self, etag, handler, *args, **kwargs):
+        """Отвечает 304, если у клиента актуальная версия, иначе
+        выполняет handler и добавляет ETag к ответу"""
+        if etag is None:
+            return handler(*args, **kwargs)
+        if_none_match = self.request.META.get('HTTP_IF_NONE_MATCH')
+        if if_none_match and (
+            etag in parse_etags(if_none_match) or if_none_match == '*'
+        ):
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            # ETag учитывает версии рецептов и состояние пользователя,
+            # поэтому годится и как версия ключа кэша ответа.
+            response = cached_response(
+                response_cache_key(self.request, etag),
+                handler, *args, **kwargs
+            )
+        if response.status_code in (status.HTTP_200_OK,
+                                    status.HTTP_304_NOT_MODIFIED):
+            response['ETag'] = etag
+            patch_vary_headers(response, ('Authorization',))
+        return response
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.conditional_response(
+            recipe_etag(request, kwargs['pk']),
+            super().retrieve, request, *args, **kwargs
+        )
+
+    def list(self, request, *args, **kwargs):
+        facets = parse_facets(request)
+        if facets:
+            # Счетчики фасетов зависят от рецептов вне текущих фильтров,
+            # поэтому ETag и кэш ответа к ним не применяются.
+            response = super().list(request, *args, **kwargs)
+            if response.status_code == status.HTTP_200_OK:
+                response.data['facets'] = facet_counts(request, facets)
+            return response
+        # Страница выбирается один раз по id и версиям, без аннотаций;
+        # полные объекты загружаются, только если ответа нет в кэше.
+        rows = self.paginate_queryset(self.filter_queryset(
+            Recipe.objects.all()
+        ).values_list('pk', 'version'))
+        etag = recipe_list_etag(request, self.paginator.page.paginator.count,
+                                rows)
+        return self.conditional_response(
+            etag, self.list_page, [pk for pk, version in rows]
+        )
+
+    def list_page(self, pks):
+        recipes = self.get_queryset().in_bulk(pks)
+        serializer = self.get_serializer(
+            [recipes[pk] for pk in pks if pk in recipes], many=True
+        )
+        return self.get_paginated_response(serializer.data)
+
+    @idempotent
+    def create(self, request, *args, **kwargs):
+        return super().create(request, *args, **kwargs)
+
     def perform_create(self, serializer):
         """Присваемваем автора при создании рецепта"""
         serializer.save(author=self.request.user)
 
+    def perform_destroy(self, instance):
+        """Рецепт скрывается сразу, а удаляется фоновой командой"""
+        mark_recipe_deleted(instance)
+
     def favorite_or_shopping_mixin(self, request, pk, model):
         user = request.user
         if request.method == 'POST':
@@ -80,6 +182,7 @@ class RecipeViewSet(viewsets.ModelViewSet):
         methods=('post', 'delete'),
         permission_classes=(IsAuthenticated,)
     )
+    @idempotent
     def favorite(self, request, pk=None):
         return self.favorite_or_shopping_mixin(request, pk, Favorite)
 
@@ -88,6 +191,7 @@ class RecipeViewSet(viewsets.ModelViewSet):
         methods=('post', 'delete'),
         permission_classes=(IsAuthenticated,)
     )
+    @idempotent
     def shopping_cart(self, request, pk):
         return self.favorite_or_shopping_mixin(request, pk, ShoppingCart)
 
@@ -107,13 +211,61 @@ class RecipeViewSet(viewsets.ModelViewSet):
         return Response('Рецепт уже удален',
                         status=status.HTTP_400_BAD_REQUEST)
 
+    @action(detail=True)
+    def similar(self, request, pk):
+        """Похожие рецепты из предрассчитанной таблицы"""
+        recipes = self.get_queryset().filter(
+            similar_to__recipe=pk
+        ).order_by('-similar_to__score')
+        serializer = self.get_serializer(recipes, many=True)
+        return Response(serializer.data)
+
     @action(
         detail=False,
         permission_classes=(IsAuthenticated,)
     )
+    def feed(self, request):
+        """Лента рецептов авторов, на которых подписан пользователь"""
+        paginator = self.pagination_class()
+        limit = paginator.get_page_size(request)
+        recipe_ids, cursor = get_feed_page(
+            request.user, request.query_params.get('cursor'), limit
+        )
+        recipes = self.get_queryset().in_bulk(recipe_ids)
+        serializer = self.get_serializer(
+            [recipes[pk] for pk in recipe_ids if pk in recipes], many=True
+        )
+        next_url = None
+        if cursor:
+            next_url = replace_query_param(
+                request.build_absolute_uri(), 'cursor', cursor
+            )
+        return Response({'next': next_url, 'results': serializer.data})
+
+    @action(detail=False)
+    def popular(self, request):
+        """Популярные рецепты за день, неделю или все время"""
+        window = request.query_params.get('window', 'week')
+        if window not in WINDOWS:
+            raise ValidationError(
+                {'window': f'Допустимые значения: {", ".join(WINDOWS)}'}
+            )
+        page = self.paginate_queryset(get_popular_ids(window))
+        recipes = self.get_queryset().in_bulk(page)
+        serializer = self.get_serializer(
+            [recipes[pk] for pk in page if pk in recipes], many=True
+        )
+        return self.get_paginated_response(serializer.data)
+
+    @action(
+        detail=False,
+        permission_classes=(IsAuthenticated,),
+        throttle_classes=(ShoppingCartThrottle,)
+    )
     def download_shopping_cart(self, request):
         ingredients = RecipeIngredients.objects.filter(
-            recipe__shopping__user=request.user
+            recipe__shopping__user=request.user,
+            recipe__deleted_at__isnull=True
         ).values(
             'ingredient__name', 'ingredient__measurement_unit'
         ).order_by(
@@ -129,15 +281,21 @@ class TagViewSet(viewsets.ReadOnlyModelViewSet):
     permission_classes = (AllowAny, )
     pagination_class = None
 
+    def list(self, request, *args, **kwargs):
+        return cached_response(
+            response_cache_key(request, get_table_version('tag')),
+            super().list, request, *args, **kwargs
+        )
+
 
 def generate_short_url():
     characters = string.ascii_letters + string.digits
-    short_url = ''.join(random.choices(characters, k=4))
-    return f"http://{settings.DOMEN}/s/" + short_url
+    return short_link_url(''.join(random.choices(characters, k=4)))
 
 
 class GetRecipeLink(APIView):
     permission_classes = (AllowAny,)
+    throttle_classes = (RecipeLinkThrottle,)
 
     def get(self, request, recipe_id):
         recipe = get_object_or_404(Recipe, id=recipe_id)
@@ -151,11 +309,72 @@ class GetRecipeLink(APIView):
 
 
 def redirect_to_full_link(request, short_link):
-    try:
-        link_obj = Link.objects.get(
-            short_link=f'http://{settings.DOMEN}/s/' + short_link
-        )
-        full_link = link_obj.original_url.replace('/api', '', 1)[:-1]
-        return redirect(full_link)
-    except Link.DoesNotExist:
-        return HttpResponse('Link not found', status=404)
+    """Переход по короткой ссылке, если его не обработал
+    ShortLinkMiddleware"""
+    return redirect_response(short_link)
+
+
+class SyncView(APIView):
+    """Изменения рецептов, тегов, ингредиентов, избранного и покупок
+    с номера since"""
+    permission_classes = (AllowAny,)
+    serializers = {
+        'tag': TagSerializer,
+        'ingredient': IngredientSerializer,
+        'recipe': RecipeSerializer,
+    }
+
+    def get_int_param(self, name, default):
+        value = self.request.query_params.get(name, default)
+        try:
+            value = int(value)
+        except (TypeError, ValueError):
+            raise ValidationError({name: 'Ожидается целое число'})
+        if value < 0:
+            raise ValidationError({name: 'Ожидается неотрицательное число'})
+        return value
+
+    def get_objects(self, table, object_ids):
+        if table == 'recipe':
+            queryset = Recipe.objects.prefetch_related(
+                'tags', author_prefetch(self.request.user)
+            )
+            if self.request.user.is_authenticated:
+                queryset = queryset.annotate_for_shopping_favourite(
+                    self.request.user
+                )
+        else:
+            queryset = self.serializers[table].Meta.model.objects.all()
+        return queryset.in_bulk(object_ids)
+
+    def get(self, request):
+        since = self.get_int_param('since', 0)
+        limit = min(self.get_int_param('limit', settings.SYNC_BATCH_SIZE),
+                    settings.SYNC_MAX_BATCH_SIZE) or settings.SYNC_BATCH_SIZE
+        entries, next_since, has_more = get_changes(request.user, since,
+                                                    limit)
+        objects = {
+            table: self.get_objects(table, [
+                entry.object_id for entry in entries
+                if entry.table == table and entry.action != DELETE
+            ])
+            for table in self.serializers
+        }
+        context = {'request': request}
+        changes = []
+        for entry in entries:
+            instance = objects.get(entry.table, {}).get(entry.object_id)
+            changes.append({
+                'seq': entry.pk,
+                'table': entry.table,
+                'action': entry.action,
+                'id': entry.object_id,
+                'data': (self.serializers[entry.table](
+                    instance, context=context
+                ).data if instance is not None else None),
+            })
+        return Response({
+            'since': next_since,
+            'has_more': has_more,
+            'changes': changes,
+        })
@@ -0,0 +1,23 @@
+from django.contrib import admin
+from django.utils import timezone
+
+from .models import FAILED, QUEUED, Task
+
+
+@admin.register(Task)
+class TaskAdmin(admin.ModelAdmin):
+    list_display = ('pk', 'name', 'status', 'attempts', 'run_at',
+                    'wait_ms', 'duration_ms', 'worker')
+    list_filter = ('status', 'name')
+    search_fields = ('name__startswith', 'key')
+    readonly_fields = ('created', 'started_at', 'finished_at', 'wait_ms',
+                       'duration_ms', 'worker', 'error')
+    actions = ('retry',)
+    show_full_result_count = False
+
+    @admin.action(description='Повторить выбранные задачи с ошибкой')
+    def retry(self, request, queryset):
+        retried = queryset.filter(status=FAILED).update(
+            status=QUEUED, attempts=0, run_at=timezone.now()
+        )
+        self.message_user(request, f'Поставлено в очередь: {retried}')
@@ -0,0 +1,24 @@
+import logging
+
+from django.core.management.base import BaseCommand
+from taskqueue.registry import registry
+from taskqueue.worker import run
+
+
+class Command(BaseCommand):
+    help = ('Воркеры очереди фоновых задач: processes процессов '
+            'по threads потоков')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=1)
+        parser.add_argument('--threads', type=int, default=4)
+        parser.add_argument('--burst', action='store_true',
+                            help='Выполнить готовые задачи и завершиться')
+
+    def handle(self, *args, **options):
+        if options['verbosity'] > 1:
+            logger = logging.getLogger('taskqueue')
+            logger.addHandler(logging.StreamHandler())
+            logger.setLevel(logging.INFO)
+        self.stdout.write('Задачи: ' + ', '.join(sorted(registry)))
+        run(options['processes'], options['threads'], options['burst'])
@@ -0,0 +1,65 @@
+import json
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db.models import Avg, Count, Max, Q
+from django.utils import timezone
+from taskqueue.models import DONE, FAILED, QUEUED, RUNNING, Task
+
+
+def percentile(values, share):
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(int(len(values) * share), len(values) - 1)]
+
+
+class Command(BaseCommand):
+    help = ('Статистика очереди: число задач по статусам, время '
+            'ожидания и выполнения по именам задач')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hours', type=float, default=24,
+                            help='Учитывать задачи, завершенные за период')
+        parser.add_argument('--json', action='store_true')
+
+    def handle(self, *args, **options):
+        since = timezone.now() - timedelta(hours=options['hours'])
+        rows = Task.objects.filter(
+            Q(status__in=(QUEUED, RUNNING)) | Q(finished_at__gte=since)
+        ).values('name').annotate(
+            queued=Count('pk', filter=Q(status=QUEUED)),
+            running=Count('pk', filter=Q(status=RUNNING)),
+            done=Count('pk', filter=Q(status=DONE)),
+            failed=Count('pk', filter=Q(status=FAILED)),
+            avg_wait_ms=Avg('wait_ms', filter=Q(status=DONE)),
+            avg_ms=Avg('duration_ms', filter=Q(status=DONE)),
+            max_ms=Max('duration_ms', filter=Q(status=DONE)),
+        ).order_by('name')
+        report = []
+        for row in rows:
+            durations = Task.objects.filter(
+                name=row['name'], status=DONE, finished_at__gte=since
+            ).order_by('-finished_at').values_list(
+                'duration_ms', flat=True
+            )[:1000]
+            row['p95_ms'] = percentile(list(durations), 0.95)
+            report.append({
+                key: round(value, 1) if isinstance(value, float) else value
+                for key, value in row.items()
+            })
+        if options['json']:
+            self.stdout.write(json.dumps(report, indent=2))
+            return
+        self.stdout.write(
+            f'{"задача":<40} {"очередь":>7} {"идет":>5} {"готово":>7} '
+            f'{"ошибки":>7} {"ожид.мс":>9} {"сред.мс":>9} {"p95 мс":>9} '
+            f'{"макс.мс":>9}'
+        )
+        for row in report:
+            self.stdout.write(
+                f'{row["name"]:<40} {row["queued"]:>7} {row["running"]:>5} '
+                f'{row["done"]:>7} {row["failed"]:>7} '
+                f'{str(row["avg_wait_ms"]):>9} {str(row["avg_ms"]):>9} '
+                f'{str(row["p95_ms"]):>9} {str(row["max_ms"]):>9}'
+            )
@@ -0,0 +1,48 @@
+# Generated by Django 4.2.11 on 2026-10-19 20:40
+
+from django.db import migrations, models
+
+
+def prepare_tasks(apps, schema_editor):
+    """Аренда выполняющихся задач и одна задача в очереди на ключ"""
+    Task = apps.get_model('taskqueue', 'Task')
+    Task.objects.filter(status='running').update(
+        heartbeat_at=models.F('started_at')
+    )
+    seen = set()
+    duplicates = []
+    for pk, key in Task.objects.filter(status='queued').exclude(
+        key=''
+    ).order_by('run_at', 'pk').values_list('pk', 'key'):
+        if key in seen:
+            duplicates.append(pk)
+        seen.add(key)
+    Task.objects.filter(pk__in=duplicates).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('taskqueue', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='task',
+            name='taskqueue_task_status_idx',
+        ),
+        migrations.AddField(
+            model_name='task',
+            name='heartbeat_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Аренда продлена'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['status', 'heartbeat_at'], name='taskqueue_task_lease_idx'),
+        ),
+        migrations.RunPython(prepare_tasks, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='task',
+            constraint=models.UniqueConstraint(condition=models.Q(('status', 'queued'), models.Q(('key', ''), _negated=True)), fields=('key',), name='taskqueue_task_queued_key'),
+        ),
+    ]
@@ -0,0 +1,73 @@
+from django.db import models
+from django.db.models import Q
+from django.utils import timezone
+
+QUEUED = 'queued'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+
+
+class Task(models.Model):
+    """Фоновая задача в очереди.
+
+    Воркеры забирают задачи запросом SELECT ... FOR UPDATE SKIP LOCKED
+    (см. taskqueue.worker), брокер сообщений не нужен. Задача воркера,
+    переставшего продлевать аренду, возвращается в очередь.
+    """
+    STATUS_CHOICES = (
+        (QUEUED, 'В очереди'),
+        (RUNNING, 'Выполняется'),
+        (DONE, 'Выполнена'),
+        (FAILED, 'Ошибка'),
+    )
+    name = models.CharField('Задача', max_length=200)
+    args = models.JSONField('Аргументы', default=list, blank=True)
+    kwargs = models.JSONField('Именованные аргументы', default=dict,
+                              blank=True)
+    key = models.CharField('Ключ', max_length=200, blank=True,
+                           db_index=True)
+    status = models.CharField('Статус', max_length=8,
+                              choices=STATUS_CHOICES, default=QUEUED)
+    attempts = models.PositiveIntegerField('Попытки', default=0)
+    max_attempts = models.PositiveIntegerField('Максимум попыток',
+                                               default=5)
+    run_at = models.DateTimeField('Запустить после', default=timezone.now)
+    created = models.DateTimeField('Дата создания', auto_now_add=True)
+    started_at = models.DateTimeField('Начало', null=True, blank=True)
+    # Воркер продлевает аренду, пока выполняет задачу.
+    heartbeat_at = models.DateTimeField('Аренда продлена', null=True,
+                                        blank=True)
+    finished_at = models.DateTimeField('Окончание', null=True, blank=True)
+    wait_ms = models.FloatField('Ожидание, мс', null=True, blank=True)
+    duration_ms = models.FloatField('Выполнение, мс', null=True,
+                                    blank=True)
+    worker = models.CharField('Воркер', max_length=100, blank=True)
+    error = models.TextField('Ошибка', blank=True)
+
+    class Meta:
+        ordering = ('-id',)
+        indexes = (
+            models.Index(
+                fields=('run_at',),
+                condition=Q(status=QUEUED),
+                name='taskqueue_task_queued_idx'
+            ),
+            models.Index(
+                fields=('status', 'heartbeat_at'),
+                name='taskqueue_task_lease_idx'
+            ),
+        )
+        constraints = (
+            # Не больше одной задачи в очереди на ключ (см. enqueue).
+            models.UniqueConstraint(
+                fields=('key',),
+                condition=Q(status=QUEUED) & ~Q(key=''),
+                name='taskqueue_task_queued_key'
+            ),
+        )
+        verbose_name = 'Задача'
+        verbose_name_plural = 'Задачи'
+
+    def __str__(self):
+        return f'{self.name} #{self.pk} ({self.status})'
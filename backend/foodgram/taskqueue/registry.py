@@ -0,0 +1,84 @@
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from .models import QUEUED, Task
+
+registry = {}
+
+
+def enqueue(name, args=(), kwargs=None, run_at=None, key='',
+            max_attempts=None):
+    """Ставит задачу в очередь в текущей транзакции.
+
+    Если в очереди уже есть задача с тем же непустым ключом, новая
+    не создается: существующая лишь переносится на более раннее время.
+    Одновременную вставку двух таких задач отсекает ограничение
+    taskqueue_task_queued_key.
+    """
+    run_at = run_at or timezone.now()
+    if settings.TASKQUEUE_EAGER:
+        func = registry[name]
+        transaction.on_commit(lambda: func(*args, **(kwargs or {})))
+        return None
+    fields = {
+        'name': name, 'args': list(args), 'kwargs': kwargs or {},
+        'run_at': run_at, 'key': key,
+        'max_attempts': max_attempts or settings.TASKQUEUE_MAX_ATTEMPTS,
+    }
+    if not key:
+        return Task.objects.create(**fields)
+    # Вторая попытка — если задачу, из-за которой вставка не прошла,
+    # воркер успел забрать из очереди.
+    for _ in range(2):
+        existing = Task.objects.filter(key=key, status=QUEUED).first()
+        if existing is not None:
+            if existing.run_at > run_at:
+                Task.objects.filter(pk=existing.pk).update(run_at=run_at)
+            return existing
+        try:
+            with transaction.atomic():
+                return Task.objects.create(**fields)
+        except IntegrityError:
+            # Такую же задачу параллельно поставил другой запрос.
+            pass
+    raise IntegrityError(f'Не удалось поставить задачу с ключом {key}')
+
+
+class RegisteredTask:
+    """Функция, которую можно выполнить в воркере очереди"""
+
+    def __init__(self, func, name, max_attempts):
+        self.func = func
+        self.name = name
+        self.max_attempts = max_attempts
+
+    def __call__(self, *args, **kwargs):
+        return self.func(*args, **kwargs)
+
+    def delay(self, *args, **kwargs):
+        return self.enqueue(args, kwargs)
+
+    def enqueue(self, args=(), kwargs=None, run_at=None, key=''):
+        return enqueue(self.name, args, kwargs, run_at=run_at, key=key,
+                       max_attempts=self.max_attempts)
+
+
+def task(func=None, name=None, max_attempts=None):
+    """Регистрирует функцию как фоновую задачу.
+
+    Аргументы задачи хранятся в JSON, поэтому передавать нужно
+    идентификаторы объектов, а не сами объекты.
+    """
+
+    def register(func):
+        registered = RegisteredTask(
+            func, name or f'{func.__module__}.{func.__name__}',
+            max_attempts
+        )
+        registry[registered.name] = registered
+        return registered
+
+    if func is not None:
+        return register(func)
+    return register
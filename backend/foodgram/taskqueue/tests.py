@@ -0,0 +1,135 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.db import IntegrityError, transaction
+from django.db.models import QuerySet
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from .models import DONE, FAILED, QUEUED, RUNNING, Task
+from .registry import enqueue, task
+from .worker import Leases, claim, execute, finish, requeue_stale
+
+
+@task(name='taskqueue.tests.succeed')
+def succeed():
+    pass
+
+
+@task(name='taskqueue.tests.fail', max_attempts=2)
+def fail():
+    raise ValueError('ошибка')
+
+
+@override_settings(TASKQUEUE_EAGER=False)
+class WorkerTests(TestCase):
+    """Захват, повторы и аренда задач"""
+
+    def make_due(self):
+        Task.objects.update(run_at=timezone.now())
+
+    def expire_lease(self, pk):
+        Task.objects.filter(pk=pk).update(
+            heartbeat_at=timezone.now() - timedelta(hours=1)
+        )
+
+    def test_claim_and_finish(self):
+        enqueue('taskqueue.tests.succeed')
+        claimed = claim('a')
+        self.assertEqual(claimed.status, RUNNING)
+        self.assertEqual(claimed.attempts, 1)
+        self.assertIsNotNone(claimed.heartbeat_at)
+        self.assertIsNone(claim('b'))
+        execute(claimed)
+        self.assertEqual(Task.objects.get().status, DONE)
+
+    def test_retry_then_fail(self):
+        enqueue('taskqueue.tests.fail', max_attempts=2)
+        with self.assertLogs('taskqueue', 'ERROR'):
+            execute(claim('a'))
+        retried = Task.objects.get()
+        self.assertEqual(retried.status, QUEUED)
+        self.assertGreater(retried.run_at, timezone.now())
+        self.assertIn('ValueError', retried.error)
+        self.assertIsNone(claim('a'))
+        self.make_due()
+        with self.assertLogs('taskqueue', 'ERROR'):
+            execute(claim('a'))
+        failed = Task.objects.get()
+        self.assertEqual(failed.status, FAILED)
+        self.assertEqual(failed.attempts, 2)
+
+    def test_renewed_lease_is_not_requeued(self):
+        enqueue('taskqueue.tests.succeed')
+        claimed = claim('a')
+        # Задача выполняется дольше аренды, но воркер ее продлевает.
+        Task.objects.update(started_at=timezone.now() - timedelta(hours=1))
+        self.expire_lease(claimed.pk)
+        leases = Leases()
+        leases.add(claimed.worker)
+        leases.renew()
+        requeue_stale()
+        self.assertEqual(Task.objects.get().status, RUNNING)
+        self.expire_lease(claimed.pk)
+        requeue_stale()
+        self.assertEqual(Task.objects.get().status, QUEUED)
+
+    def test_finish_after_lost_lease_is_ignored(self):
+        enqueue('taskqueue.tests.succeed')
+        first = claim('a')
+        self.expire_lease(first.pk)
+        requeue_stale()
+        second = claim('b')
+        self.assertEqual(second.attempts, 2)
+        with self.assertLogs('taskqueue', 'WARNING'):
+            finish(first)
+        self.assertEqual(Task.objects.get().status, RUNNING)
+        finish(second)
+        self.assertEqual(Task.objects.get().status, DONE)
+
+    def test_retry_with_queued_twin_fails(self):
+        enqueue('taskqueue.tests.fail', key='twin')
+        claimed = claim('a')
+        enqueue('taskqueue.tests.fail', key='twin')
+        with self.assertLogs('taskqueue', 'ERROR'):
+            execute(claimed)
+        self.assertEqual(Task.objects.get(pk=claimed.pk).status, FAILED)
+        self.assertEqual(Task.objects.filter(status=QUEUED).count(), 1)
+
+
+@override_settings(TASKQUEUE_EAGER=False)
+class EnqueueTests(TestCase):
+    """Одна задача в очереди на ключ"""
+
+    def test_same_key_queued_once(self):
+        later = timezone.now() + timedelta(minutes=10)
+        first = enqueue('taskqueue.tests.succeed', key='k', run_at=later)
+        second = enqueue('taskqueue.tests.succeed', key='k')
+        self.assertEqual(first.pk, second.pk)
+        self.assertEqual(Task.objects.count(), 1)
+        self.assertLess(Task.objects.get().run_at, later)
+
+    def test_key_free_after_claim(self):
+        enqueue('taskqueue.tests.succeed', key='k')
+        claim('a')
+        enqueue('taskqueue.tests.succeed', key='k')
+        self.assertEqual(Task.objects.count(), 2)
+
+    def test_concurrent_enqueue(self):
+        enqueue('taskqueue.tests.succeed', key='k')
+        first = QuerySet.first
+        calls = []
+
+        def racing_first(queryset):
+            # Первая проверка не видит задачу, как параллельный запрос.
+            calls.append(queryset)
+            return None if len(calls) == 1 else first(queryset)
+
+        with mock.patch.object(QuerySet, 'first', racing_first):
+            enqueue('taskqueue.tests.succeed', key='k')
+        self.assertEqual(Task.objects.count(), 1)
+
+    def test_constraint(self):
+        Task.objects.create(name='taskqueue.tests.succeed', key='k')
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Task.objects.create(name='taskqueue.tests.succeed', key='k')
@@ -0,0 +1,274 @@
+import logging
+import multiprocessing
+import os
+import random
+import signal
+import socket
+import threading
+import time
+import traceback
+import uuid
+from contextlib import nullcontext
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import (DatabaseError, IntegrityError, close_old_connections,
+                       connection, connections, transaction)
+from django.db.models import Exists, F, OuterRef, Q
+from django.utils import timezone
+from foodgram import metrics
+
+from .models import DONE, FAILED, QUEUED, RUNNING, Task
+from .registry import enqueue, registry
+
+logger = logging.getLogger('taskqueue')
+
+
+def retry_delay(attempts):
+    """Экспоненциальная задержка перед повтором со случайным разбросом"""
+    delay = min(settings.TASKQUEUE_RETRY_BACKOFF * 2 ** (attempts - 1),
+                settings.TASKQUEUE_RETRY_BACKOFF_MAX)
+    return timedelta(seconds=delay * random.uniform(0.5, 1))
+
+
+def claim(worker):
+    """Забирает одну готовую задачу или возвращает None.
+
+    В PostgreSQL строки, заблокированные другими воркерами,
+    пропускаются (SKIP LOCKED). Условный UPDATE с уникальной меткой
+    защищает от двойного захвата в СУБД без SELECT ... FOR UPDATE.
+    """
+    token = f'{worker}:{uuid.uuid4().hex[:8]}'
+    now = timezone.now()
+    # Без SELECT ... FOR UPDATE транзакция не нужна, а в SQLite
+    # чтение с последующей записью в ней приводит к блокировкам.
+    if connection.features.has_select_for_update:
+        atomic = transaction.atomic()
+    else:
+        atomic = nullcontext()
+    with atomic:
+        pk = Task.objects.select_for_update(skip_locked=True).filter(
+            status=QUEUED, run_at__lte=now
+        ).order_by('run_at').values_list('pk', flat=True).first()
+        if pk is None:
+            return None
+        claimed = Task.objects.filter(pk=pk, status=QUEUED).update(
+            status=RUNNING, worker=token, started_at=now, heartbeat_at=now,
+            attempts=F('attempts') + 1
+        )
+    if not claimed:
+        return None
+    return Task.objects.filter(pk=pk, worker=token).first()
+
+
+def finish(task, error=None):
+    """Записывает результат выполнения и планирует повтор при ошибке.
+
+    Результат пишется, только если задача все еще принадлежит этому
+    захвату: после истечения аренды ее мог забрать другой воркер.
+    """
+    now = timezone.now()
+    task.finished_at = now
+    task.duration_ms = (now - task.started_at).total_seconds() * 1000
+    task.wait_ms = max(
+        (task.started_at - task.run_at).total_seconds() * 1000, 0
+    )
+    if error is None:
+        task.status = DONE
+        task.error = ''
+    elif task.attempts < task.max_attempts:
+        task.status = QUEUED
+        task.error = error
+        task.run_at = now + retry_delay(task.attempts)
+    else:
+        task.status = FAILED
+        task.error = error
+    claimed = Task.objects.filter(pk=task.pk, worker=task.worker,
+                                  status=RUNNING)
+    fields = {field: getattr(task, field) for field in (
+        'status', 'error', 'run_at', 'finished_at', 'duration_ms', 'wait_ms'
+    )}
+    try:
+        with transaction.atomic():
+            updated = claimed.update(**fields)
+    except IntegrityError:
+        # В очереди уже есть задача с тем же ключом, она и выполнит
+        # работу; повтор этой не нужен.
+        task.status = fields['status'] = FAILED
+        updated = claimed.update(**fields)
+    if not updated:
+        logger.warning('Аренда задачи %s #%s истекла, результат не записан',
+                       task.name, task.pk)
+        return
+    metrics.incr({DONE: 'tasks.done', QUEUED: 'tasks.retried',
+                  FAILED: 'tasks.failed'}[task.status])
+
+
+def execute(task):
+    func = registry.get(task.name)
+    if func is None:
+        # Повтор не поможет: задачу не знает ни один воркер этой версии.
+        task.max_attempts = task.attempts
+        finish(task, f'Неизвестная задача {task.name}')
+        return
+    try:
+        func(*task.args, **task.kwargs)
+    except Exception:
+        logger.exception('Ошибка задачи %s #%s', task.name, task.pk)
+        finish(task, traceback.format_exc())
+    else:
+        finish(task)
+    logger.info('Задача %s #%s: %s за %.1f мс', task.name, task.pk,
+                task.status, task.duration_ms)
+
+
+def requeue_stale():
+    """Возвращает в очередь задачи с истекшей арендой: их воркер
+    завершился аварийно или завис"""
+    error = 'Истекла аренда: воркер не продлевал задачу'
+    stale = Task.objects.filter(
+        status=RUNNING,
+        heartbeat_at__lt=timezone.now() - timedelta(
+            seconds=settings.TASKQUEUE_LEASE
+        )
+    )
+    queued_twin = Task.objects.filter(
+        key=OuterRef('key'), status=QUEUED
+    ).exclude(key='')
+    failed = stale.filter(
+        Q(attempts__gte=F('max_attempts')) | Exists(queued_twin)
+    ).update(status=FAILED, error=error)
+    requeued = stale.update(status=QUEUED, run_at=timezone.now(),
+                            error=error)
+    if failed or requeued:
+        metrics.incr('tasks.failed', failed)
+        metrics.incr('tasks.retried', requeued)
+
+
+def schedule_periodic():
+    """Ставит в очередь периодические задачи из TASKQUEUE_PERIODIC"""
+    now = timezone.now()
+    for name, interval in settings.TASKQUEUE_PERIODIC.items():
+        if name in registry:
+            enqueue(name, key=name, run_at=now + timedelta(seconds=interval))
+
+
+def cleanup_done():
+    Task.objects.filter(
+        status=DONE,
+        finished_at__lt=timezone.now() - timedelta(
+            seconds=settings.TASKQUEUE_KEEP_DONE
+        )
+    ).delete()
+
+
+def maintenance():
+    requeue_stale()
+    schedule_periodic()
+    cleanup_done()
+
+
+class Leases:
+    """Задачи, которые сейчас выполняют потоки процесса"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.tokens = set()
+
+    def add(self, token):
+        with self.lock:
+            self.tokens.add(token)
+
+    def discard(self, token):
+        with self.lock:
+            self.tokens.discard(token)
+
+    def renew(self):
+        with self.lock:
+            tokens = list(self.tokens)
+        if tokens:
+            Task.objects.filter(worker__in=tokens, status=RUNNING).update(
+                heartbeat_at=timezone.now()
+            )
+
+
+def worker_loop(stop, burst, leases):
+    """Цикл потока: забирает и выполняет задачи до сигнала остановки"""
+    worker = (f'{socket.gethostname()}:{os.getpid()}:'
+              f'{threading.get_ident()}')
+    try:
+        while not stop.is_set():
+            close_old_connections()
+            try:
+                task = claim(worker)
+                if task is not None:
+                    leases.add(task.worker)
+                    try:
+                        execute(task)
+                    finally:
+                        leases.discard(task.worker)
+            except DatabaseError:
+                # Задача, захваченная перед ошибкой, вернется в очередь,
+                # когда истечет ее аренда.
+                logger.exception('Ошибка базы данных в воркере')
+                task = None
+            if task is None:
+                if burst:
+                    break
+                stop.wait(settings.TASKQUEUE_POLL_INTERVAL)
+    finally:
+        connection.close()
+
+
+def run_process(threads, burst):
+    """Процесс воркера: пул потоков, продление аренды задач
+    и периодическое обслуживание"""
+    stop = threading.Event()
+    for signum in (signal.SIGTERM, signal.SIGINT):
+        signal.signal(signum, lambda *args: stop.set())
+    leases = Leases()
+    pool = [threading.Thread(target=worker_loop, args=(stop, burst, leases))
+            for _ in range(threads)]
+    for thread in pool:
+        thread.start()
+    next_heartbeat = next_maintenance = 0
+    while any(thread.is_alive() for thread in pool):
+        now = time.monotonic()
+        try:
+            if now >= next_heartbeat:
+                close_old_connections()
+                leases.renew()
+                next_heartbeat = now + settings.TASKQUEUE_HEARTBEAT_INTERVAL
+            if not burst and now >= next_maintenance:
+                close_old_connections()
+                maintenance()
+                next_maintenance = (
+                    now + settings.TASKQUEUE_MAINTENANCE_INTERVAL
+                )
+        except DatabaseError:
+            logger.exception('Ошибка базы данных при обслуживании очереди')
+        stop.wait(1)
+    connection.close()
+
+
+def run(processes, threads, burst=False):
+    """Запускает processes процессов по threads потоков"""
+    if processes == 1:
+        run_process(threads, burst)
+        return
+    # Соединения родителя нельзя разделять с дочерними процессами.
+    connections.close_all()
+    context = multiprocessing.get_context('fork')
+    children = [context.Process(target=run_process, args=(threads, burst))
+                for _ in range(processes)]
+    for child in children:
+        child.start()
+
+    def terminate(*args):
+        for child in children:
+            child.terminate()
+
+    for signum in (signal.SIGTERM, signal.SIGINT):
+        signal.signal(signum, terminate)
+    for child in children:
+        child.join()
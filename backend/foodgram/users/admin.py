@@ -1,4 +1,6 @@
 from django.contrib import admin
+from recipes.deletion import mark_user_deleted
+from recipes.paginators import EstimatedCountPaginator
 
 from .models import Subscription, User
 
@@ -6,12 +8,25 @@ from .models import Subscription, User
 @admin.register(User)
 class UserAdmin(admin.ModelAdmin):
     list_display = ('pk', 'email', 'username', 'first_name', 'last_name')
-    search_fields = ('username', 'email', 'first_name', 'last_name')
-    list_filter = ('username', 'email')
+    search_fields = ('username__startswith', 'email__startswith')
+    list_filter = ('is_staff', 'is_active')
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    def delete_model(self, request, obj):
+        mark_user_deleted(obj)
+
+    def delete_queryset(self, request, queryset):
+        for user in queryset:
+            mark_user_deleted(user)
 
 
 @admin.register(Subscription)
 class SubscriptionAdmin(admin.ModelAdmin):
     list_display = ('pk', 'user', 'author')
-    search_fields = ('user', 'author')
-    list_filter = ('user', 'author')
+    list_select_related = ('user', 'author')
+    raw_id_fields = ('user', 'author')
+    search_fields = ('user__username__startswith',
+                     'author__username__startswith')
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
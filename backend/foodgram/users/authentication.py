@@ -0,0 +1,28 @@
+from django.conf import settings
+from django.core.cache import cache
+from foodgram import metrics
+from rest_framework.authentication import TokenAuthentication
+
+
+def token_cache_key(key):
+    return f'auth_token:{key}'
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """TokenAuthentication с кэшированием токена вместе с пользователем.
+
+    Запись сбрасывается сигналами при удалении токена (logout, удаление
+    пользователя) и при любом сохранении пользователя (смена пароля,
+    деактивация), TTL ограничивает срок жизни остальных изменений.
+    """
+
+    def authenticate_credentials(self, key):
+        cache_key = token_cache_key(key)
+        token = cache.get(cache_key)
+        if token is not None:
+            metrics.incr('auth_token.hit')
+            return token.user, token
+        metrics.incr('auth_token.miss')
+        user, token = super().authenticate_credentials(key)
+        cache.set(cache_key, token, settings.TOKEN_CACHE_TTL)
+        return user, token
@@ -0,0 +1,21 @@
+# Generated by Django 4.2.11 on 2026-10-19 20:06
+
+from django.db import migrations
+import users.models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0005_user_avatar_index'),
+    ]
+
+    operations = [
+        migrations.AlterModelManagers(
+            name='user',
+            managers=[
+                ('objects', users.models.ActiveUserManager()),
+                ('all_objects', users.models.AllUsersManager()),
+            ],
+        ),
+    ]
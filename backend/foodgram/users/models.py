@@ -1,9 +1,34 @@
-from django.contrib.auth.models import AbstractUser
+from django.contrib.auth.models import AbstractUser, UserManager
 from django.db import models
+from django.db.models import Exists, OuterRef, Value
 
 from .validators import username_validator
 
 
+class UserQuerySet(models.QuerySet):
+
+    def annotate_for_viewer(self, user):
+        """Подписан ли user на каждого из выбранных пользователей"""
+        if not user.is_authenticated:
+            return self.annotate(is_subscribed=Value(False))
+        return self.annotate(
+            is_subscribed=Exists(Subscription.objects.filter(
+                user=user,
+                author=OuterRef('pk')))
+        )
+
+
+class AllUsersManager(UserManager.from_queryset(UserQuerySet)):
+    """Менеджер со всеми пользователями, включая ожидающих удаления"""
+
+
+class ActiveUserManager(AllUsersManager):
+    """Менеджер без пользователей, ожидающих удаления"""
+
+    def get_queryset(self):
+        return super().get_queryset().filter(deleted_at__isnull=True)
+
+
 class User(AbstractUser):
     """Переопределение модели пользователя"""
     email = models.EmailField(
@@ -29,7 +54,16 @@ class User(AbstractUser):
         'Пароль',
         max_length=128
     )
-    avatar = models.ImageField(blank=True)
+    avatar = models.ImageField(blank=True, db_index=True)
+    deleted_at = models.DateTimeField(
+        'Дата удаления',
+        null=True,
+        blank=True,
+        editable=False
+    )
+
+    objects = ActiveUserManager()
+    all_objects = AllUsersManager()
 
     class Meta:
         verbose_name = 'Пользователь'
@@ -2,10 +2,43 @@ from djoser.serializers import (UserCreateSerializer,
                                 UserSerializer as DjoserUserSerialiser)
 from drf_extra_fields.fields import Base64ImageField
 from rest_framework import serializers
+from rest_framework.exceptions import ValidationError
+from rest_framework.validators import UniqueValidator
 
 import recipes
 from recipes.models import Recipe
 from .models import Subscription, User
+from .validators import username_validator
+
+
+def recipes_limit(request):
+    """Значение параметра recipes_limit или None"""
+    value = request.GET.get('recipes_limit')
+    if not value:
+        return None
+    try:
+        limit = int(value)
+    except ValueError:
+        limit = -1
+    if limit < 0:
+        raise ValidationError(
+            {'recipes_limit': 'Ожидается целое неотрицательное число'}
+        )
+    return limit
+
+
+# Пользователи, ожидающие удаления, скрыты менеджером objects,
+# но их email и username по-прежнему заняты.
+UNIQUE_USER_FIELDS = {
+    'email': {'validators': [UniqueValidator(
+        queryset=User.all_objects.all(),
+        message='Пользователь с таким email уже существует.'
+    )]},
+    'username': {'validators': [username_validator, UniqueValidator(
+        queryset=User.all_objects.all(),
+        message='Пользователь с таким именем уже существует.'
+    )]},
+}
 
 
 class UserSignUpSerializer(UserCreateSerializer):
@@ -15,6 +48,7 @@ class UserSignUpSerializer(UserCreateSerializer):
         model = User
         fields = ('email', 'id', 'username', 'first_name',
                   'last_name', 'password')
+        extra_kwargs = UNIQUE_USER_FIELDS
 
 
 class UserSerializer(DjoserUserSerialiser):
@@ -27,12 +61,18 @@ class UserSerializer(DjoserUserSerialiser):
         fields = ('email', 'id', 'username', 'first_name', 'last_name',
                   'password', 'is_subscribed', 'avatar')
         read_only_fields = ('id', 'is_subscribed',)
-        extra_kwargs = {'password': {'write_only': True}, }
+        extra_kwargs = {'password': {'write_only': True},
+                        **UNIQUE_USER_FIELDS}
 
     def get_is_subscribed(self, obj):
         request = self.context.get('request')
         if request is None or request.user.is_anonymous:
             return False
+        if obj.pk == request.user.pk:
+            return False
+        # В списках значение приходит аннотацией annotate_for_viewer.
+        if hasattr(obj, 'is_subscribed'):
+            return obj.is_subscribed
         return Subscription.objects.filter(
             user=request.user, author=obj
         ).exists()
@@ -75,26 +115,25 @@ class SubscriptionSerializer(serializers.ModelSerializer):
         )
 
     def get_is_subscribed(self, obj):
-        request = self.context.get('request')
-        return Subscription.objects.filter(
-            author=obj.author, user=request.user
-        ).exists()
+        # Объект и есть подписка текущего пользователя.
+        return True
 
     def get_recipes(self, obj):
-        request = self.context.get('request')
-        if request.GET.get('recipes_limit'):
-            recipe_limit = int(request.GET.get('recipes_limit'))
-            queryset = Recipe.objects.filter(
-                author=obj.author)[:recipe_limit]
+        if hasattr(obj.author, 'recipes_page'):
+            queryset = obj.author.recipes_page
         else:
-            queryset = Recipe.objects.filter(
-                author=obj.author)
+            queryset = Recipe.objects.filter(author=obj.author)
+            recipe_limit = recipes_limit(self.context.get('request'))
+            if recipe_limit is not None:
+                queryset = queryset[:recipe_limit]
         serializer = recipes.serializers.ShortRecipeSerializer(
             queryset, read_only=True, many=True
         )
         return serializer.data
 
     def get_recipes_count(self, obj):
+        if hasattr(obj, 'recipes_count'):
+            return obj.recipes_count
         return obj.author.recipes.count()
 
 
@@ -0,0 +1,22 @@
+from django.core.cache import cache
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from .authentication import token_cache_key
+from .models import User
+
+
+@receiver(post_delete, sender=Token)
+def token_deleted(sender, instance, **kwargs):
+    cache.delete(token_cache_key(instance.key))
+
+
+@receiver(post_save, sender=User)
+def user_changed(sender, instance, **kwargs):
+    cache.delete_many([
+        token_cache_key(key)
+        for key in Token.objects.filter(
+            user=instance
+        ).values_list('key', flat=True)
+    ])
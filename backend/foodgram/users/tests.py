@@ -0,0 +1,95 @@
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from recipes.deletion import mark_user_deleted
+from recipes.models import Recipe
+from rest_framework.test import APIClient
+
+from .models import Subscription, User
+
+
+class UserListQueriesTests(TestCase):
+    """Число запросов к БД не зависит от размера страницы"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.reader = User.objects.create_user(
+            username='reader', email='reader@example.org', password='pass'
+        )
+        for number in range(5):
+            author = User.objects.create_user(
+                username=f'author{number}',
+                email=f'author{number}@example.org', password='pass'
+            )
+            Subscription.objects.create(user=cls.reader, author=author)
+            for recipe in range(3):
+                Recipe.objects.create(
+                    author=author, name=f'Рецепт {number}-{recipe}',
+                    image='recipes/test.png', text='Текст', cooking_time=10
+                )
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.reader)
+
+    def test_user_list(self):
+        # COUNT для пагинации и страница пользователей с is_subscribed;
+        # в PostgreSQL перед COUNT пагинатор читает оценку из pg_class.
+        queries = 3 if connection.vendor == 'postgresql' else 2
+        with self.assertNumQueries(queries):
+            response = self.client.get('/api/users/')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(any(user['is_subscribed']
+                            for user in response.data['results']))
+
+    def test_subscriptions(self):
+        # COUNT, страница подписок с числом рецептов и рецепты авторов.
+        with self.assertNumQueries(3):
+            response = self.client.get('/api/users/subscriptions/',
+                                       {'recipes_limit': 2})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['results']), 5)
+        for author in response.data['results']:
+            self.assertEqual(len(author['recipes']), 2)
+            self.assertEqual(author['recipes_count'], 3)
+
+    def test_invalid_recipes_limit(self):
+        for value in ('abc', '-1'):
+            response = self.client.get('/api/users/subscriptions/',
+                                       {'recipes_limit': value})
+            self.assertEqual(response.status_code, 400)
+            self.assertIn('recipes_limit', response.data)
+
+    def test_invalid_recipes_limit_keeps_subscriptions(self):
+        author = User.objects.create_user(
+            username='new', email='new@example.org', password='pass'
+        )
+        response = self.client.post(
+            f'/api/users/{author.pk}/subscribe/?recipes_limit=abc'
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Subscription.objects.filter(
+            user=self.reader, author=author
+        ).exists())
+
+
+class UserUpdateTests(TestCase):
+    """Email и username пользователей, ожидающих удаления, заняты"""
+
+    def test_cannot_take_pending_delete_email(self):
+        user = User.objects.create_user(
+            username='user', email='user@example.org', password='pass'
+        )
+        gone = User.objects.create_user(
+            username='gone', email='gone@example.org', password='pass'
+        )
+        mark_user_deleted(gone)
+        client = APIClient()
+        client.force_authenticate(user)
+        response = client.patch(f'/api/users/{user.pk}/',
+                                {'email': 'gone@example.org',
+                                 'username': 'gone'}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('email', response.data)
+        self.assertIn('username', response.data)
@@ -1,6 +1,12 @@
+from django.db.models import Count, Prefetch, Q
 from django.shortcuts import get_object_or_404
+from djoser import utils
 from djoser.views import UserViewSet
-from recipes.pagination import RecipePagination
+from recipes.deletion import mark_user_deleted
+from recipes.idempotency import idempotent
+from recipes.models import Recipe
+from recipes.pagination import RecipePagination, UserPagination
+from recipes.throttling import AvatarThrottle
 from rest_framework import status
 from rest_framework.decorators import action
 from rest_framework.generics import ListAPIView
@@ -10,14 +16,26 @@ from rest_framework.response import Response
 
 from .models import Subscription, User
 from .serializers import (AvatarSerializer, UserSerializer,
-                          SubscribSerializer, SubscriptionSerializer)
+                          SubscribSerializer, SubscriptionSerializer,
+                          recipes_limit)
 
 
 class MyUserViewSet(UserViewSet):
     queryset = User.objects.all()
     serializer_class = UserSerializer
     permission_classes = (IsAuthenticatedOrReadOnly,)
-    pagination_class = RecipePagination
+    pagination_class = UserPagination
+
+    def get_queryset(self):
+        return super().get_queryset().annotate_for_viewer(
+            self.request.user
+        ).order_by('pk')
+
+    def perform_destroy(self, instance):
+        """Пользователь скрывается сразу, а удаляется фоновой командой"""
+        if instance == self.request.user:
+            utils.logout_user(self.request)
+        mark_user_deleted(instance)
 
     @action(detail=False,
             methods=['get'],
@@ -31,6 +49,7 @@ class MyUserViewSet(UserViewSet):
     @action(
         methods=['GET', 'PUT'],
         permission_classes=[IsAuthenticated],
+        throttle_classes=[AvatarThrottle],
         detail=False,
         url_name='avatar',
         url_path='me/avatar'
@@ -60,10 +79,13 @@ class MyUserViewSet(UserViewSet):
         permission_classes=(IsAuthenticated,),
         url_path='subscribe', url_name='subscribe'
     )
+    @idempotent
     def subscribe(self, request, id):
         """Метод для управления подписками """
         user = request.user
         author = get_object_or_404(User, id=id)
+        # Неверный recipes_limit отклоняется до изменения подписки.
+        recipes_limit(request)
         change_subscription_status = Subscription.objects.filter(
             user=user.id, author=author.id
         )
@@ -97,4 +119,16 @@ class SubscriptionViewSet(ListAPIView):
 
     def get_queryset(self):
         user = self.request.user
-        return user.follower.all()
+        recipes = Recipe.objects.all()
+        recipe_limit = recipes_limit(self.request)
+        if recipe_limit is not None:
+            recipes = recipes[:recipe_limit]
+        return user.follower.filter(
+            author__deleted_at__isnull=True
+        ).select_related('author').prefetch_related(
+            Prefetch('author__recipes', queryset=recipes,
+                     to_attr='recipes_page')
+        ).annotate(recipes_count=Count(
+            'author__recipes',
+            filter=Q(author__recipes__deleted_at__isnull=True)
+        )).order_by('pk')